@@ -2,167 +2,54 @@
 
 import io
 import json
+import os
+import sys
+import zipfile
+import zlib
 from pathlib import Path
 
-import docx
-import fitz  # PyMuPDF
 from fastapi import UploadFile
 
-# --- All the logic from your redaction_engine.py goes here ---
-import re
-from transformers import pipeline
+# The redaction engine is shared with the CLI and the root API; it lives in the
+# pii_engine package at the repository root. Appended rather than prepended so
+# that backend/main.py keeps precedence over the root main.py.
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pii_engine import BlockStore, PIIRedactor, TEXT_SUFFIXES, extract_blocks  # noqa: E402
 
-class PIIRedactor:
-    def __init__(self, model_name="Jean-Baptiste/roberta-large-ner-english"):
-        print(f"Loading NER model ({model_name})... This might take a moment.")
-        # IMPORTANT: Specify device=0 to use GPU if available, otherwise it will use CPU.
-        # For CPU-only, you can use device=-1 or remove the argument.
-        try:
-            self.ner_pipeline = pipeline("ner", model=model_name, grouped_entities=True, device=0)
-            print("NER model loaded on GPU.")
-        except Exception:
-            print("GPU not available or CUDA not set up correctly. Loading NER model on CPU.")
-            self.ner_pipeline = pipeline("ner", model=model_name, grouped_entities=True)
-            print("NER model loaded on CPU.")
-
-
-        phone_regex = r"""
-            \b
-            (?:(?:\+91|0)[\s-]?)?[6-9]\d{2}[\s-]?\d{3}[\s-]?\d{4}\b|
-            \b0\d{2,4}[\s-]?\d{6,8}\b
-        """
-        self.regex_patterns = {
-            "EMAIL": re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'),
-            "PHONE": re.compile(phone_regex, re.VERBOSE),
-            "AADHAAR": re.compile(r'\b[2-9]\d{3}\s?\d{4}\s?\d{4}\b'),
-            "PAN_CARD": re.compile(r'\b[A-Z]{5}\d{4}[A-Z]{1}\b'),
-            "ACCOUNT_NO": re.compile(r'\b\d{9,18}\b'),
-        }
-        self.entity_priorities = {
-            'AADHAAR': 1, 'PAN_CARD': 1, 'PHONE': 2, 'EMAIL': 2, 'PER': 3,
-            'ORG': 3, 'LOC': 4, 'DATE': 4, 'ADDRESS': 5, 'PINCODE': 5,
-            'ACCOUNT_NO': 99,
-        }
-        self.compliance_map = {
-            "GDPR": ["PER", "LOC", "EMAIL", "PHONE", "DATE"],
-            "HIPAA": ["PER", "PHONE", "DATE", "LOC", "AGE", "ID"],
-            "DPDP": ["PER", "EMAIL", "PHONE", "ACCOUNT_NO", "AADHAAR", "PAN_CARD", "LOC", "PINCODE"],
-            "FULL_REDACTION": ["PER", "ORG", "LOC", "EMAIL", "PHONE", "ACCOUNT_NO", "AADHAAR", "PAN_CARD", "DATE", "PINCODE"]
-        }
-
-    def _resolve_overlaps(self, entities):
-        if not entities: return []
-        entities.sort(key=lambda x: (x['start'], -(x['end'] - x['start'])))
-        resolved = []
-        last_entity = None
-        for current_entity in entities:
-            if last_entity is None:
-                last_entity = current_entity
-                continue
-            if current_entity['start'] < last_entity['end']:
-                last_priority = self.entity_priorities.get(last_entity['entity_group'], 100)
-                current_priority = self.entity_priorities.get(current_entity['entity_group'], 100)
-                if current_priority < last_priority:
-                    last_entity = current_entity
-            else:
-                resolved.append(last_entity)
-                last_entity = current_entity
-        if last_entity is not None:
-            resolved.append(last_entity)
-        return resolved
-
-    def detect_pii(self, text):
-        ner_results = self.ner_pipeline(text)
-        for entity in ner_results: entity['score'] = float(entity['score'])
-        regex_results = []
-        for entity_type, pattern in self.regex_patterns.items():
-            for match in pattern.finditer(text):
-                regex_results.append({
-                    'entity_group': entity_type, 'score': 1.0, 'word': match.group(0),
-                    'start': match.start(), 'end': match.end()
-                })
-        all_entities = ner_results + regex_results
-        resolved_entities = self._resolve_overlaps(all_entities)
-        resolved_entities.sort(key=lambda x: x['start'])
-        return resolved_entities
-
-    def _stitch_address_entities(self, entities, text, max_gap=15):
-        stitched_entities = []
-        i = 0
-        address_components = {"LOC", "PINCODE"}
-        while i < len(entities):
-            current_entity = entities[i]
-            if current_entity['entity_group'] in address_components:
-                address_block = [current_entity]
-                j = i + 1
-                while j < len(entities):
-                    next_entity = entities[j]
-                    if next_entity['entity_group'] in address_components:
-                        gap_text = text[address_block[-1]['end']:next_entity['start']]
-                        if len(gap_text) < max_gap and all(c in ',- \n\t' for c in gap_text):
-                            address_block.append(next_entity)
-                            j += 1
-                        else: break
-                    else: break
-                if len(address_block) > 1:
-                    start_char, end_char = address_block[0]['start'], address_block[-1]['end']
-                    stitched_entities.append({
-                        'entity_group': 'ADDRESS', 'score': min(e['score'] for e in address_block),
-                        'word': text[start_char:end_char], 'start': start_char, 'end': end_char
-                    })
-                    i = j
-                else:
-                    stitched_entities.append(current_entity)
-                    i += 1
-            else:
-                stitched_entities.append(current_entity)
-                i += 1
-        return stitched_entities
-
-    def redact(self, text, compliance_mode="DPDP", agentic_level=0.75, aggressive=False):
-        raw_entities = self.detect_pii(text)
-        processed_entities = self._stitch_address_entities(raw_entities, text)
-        entities_to_redact_types = self.compliance_map.get(compliance_mode, []).copy()
-        if "LOC" in entities_to_redact_types or "PINCODE" in entities_to_redact_types:
-            if "ADDRESS" not in entities_to_redact_types:
-                entities_to_redact_types.append("ADDRESS")
-        filtered_entities = [e for e in processed_entities if e['entity_group'] in entities_to_redact_types]
-        filtered_entities.sort(key=lambda x: x['start'], reverse=True)
-        redacted_text = text
-        for entity in filtered_entities:
-            start, end = entity['start'], entity['end']
-            entity_type, score = entity['entity_group'], entity['score']
-            if aggressive or score >= agentic_level:
-                redaction_marker = f"[{entity_type}]"
-            else:
-                redaction_marker = f"[NEEDS_REVIEW: {entity['word']} ({entity_type})]"
-            redacted_text = redacted_text[:start] + redaction_marker + redacted_text[end:]
-        return redacted_text
-
-    def redact_json_recursively(self, data, compliance_mode, agentic_level, aggressive):
-        if isinstance(data, dict):
-            return {k: self.redact_json_recursively(v, compliance_mode, agentic_level, aggressive) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self.redact_json_recursively(i, compliance_mode, agentic_level, aggressive) for i in data]
-        elif isinstance(data, str):
-            return self.redact(data, compliance_mode, agentic_level, aggressive)
-        else:
-            return data
-
-# --- IMPORTANT: Instantiate the model ONCE at the module level ---
-# This ensures the heavy ML model is loaded only when the server starts.
+# --- IMPORTANT: Instantiate the redactor ONCE at the module level ---
+# Creating it is cheap; the NER model is loaded on the first request, or up front
+# by serve.py before it forks workers.
 redactor = PIIRedactor()
 
+# Incremental mode: set REDACTION_BLOCK_STORE to a SQLite path to reuse detection
+# results for paragraphs that were already seen in earlier revisions.
+block_store = BlockStore(os.environ["REDACTION_BLOCK_STORE"]) if os.getenv("REDACTION_BLOCK_STORE") else None
+
 
 # The PIIRedactor class remains the same...
 
 # ... (scroll down to the handle_uploaded_file function)
 
+RESPONSE_MODES = ["full", "manifest", "download"]
+
+
+def _manifest_result(filename, manifest, compliance_mode):
+    return {
+        "filename": filename,
+        "manifest": manifest,
+        "message": f"File redacted successfully with mode: {compliance_mode}",
+        "status": "success"
+    }
+
+
 # MODIFIED: The function now accepts the redaction parameters
-async def handle_uploaded_file(file: UploadFile, compliance_mode: str, agentic_level: float, aggressive: bool):
+async def handle_uploaded_file(file: UploadFile, compliance_mode: str, agentic_level: float, aggressive: bool,
+                               response_mode: str = "full"):
     """
     Reads an uploaded file, extracts text, performs redaction using dynamic parameters,
     and returns the original and redacted content.
+    With response_mode="manifest" only the span manifest is returned (for JSON files,
+    one manifest per string leaf in document order); "download" drops original_text.
     """
     filename = file.filename
     content = await file.read()
@@ -174,32 +61,40 @@ async def handle_uploaded_file(file: UploadFile, compliance_mode: str, agentic_l
     try:
         if file_suffix == ".json":
             original_data = json.loads(content)
+            if response_mode == "manifest":
+                leaves = _collect_json_strings(original_data, [])
+                manifests = [
+                    redactor.manifest(leaf, compliance_mode, agentic_level, aggressive, block_store)
+                    for leaf in leaves
+                ]
+                return _manifest_result(filename, {"leaves": manifests}, compliance_mode)
             # MODIFIED: Use the passed-in parameters
             redacted_data = redactor.redact_json_recursively(
                 original_data,
                 compliance_mode=compliance_mode,
                 agentic_level=agentic_level,
-                aggressive=aggressive
+                aggressive=aggressive,
+                block_store=block_store
             )
             original_text = json.dumps(original_data, indent=2)
             redacted_text = json.dumps(redacted_data, indent=2)
         
-        elif file_suffix in [".txt", ".docx", ".pdf"]:
-            if file_suffix == ".txt":
-                original_text = content.decode("utf-8", errors="ignore")
-            elif file_suffix == ".docx":
-                doc = docx.Document(io.BytesIO(content))
-                original_text = "\n".join([para.text for para in doc.paragraphs])
-            elif file_suffix == ".pdf":
-                with fitz.open(stream=content, filetype="pdf") as doc:
-                    original_text = "".join(page.get_text() for page in doc)
+        elif file_suffix in TEXT_SUFFIXES:
+            # DOCX paragraphs and PDF pages become blocks, so edits only re-run their own block
+            original_text, blocks = extract_blocks(file_suffix, content)
+            if response_mode == "manifest":
+                manifest = redactor.manifest(original_text, compliance_mode, agentic_level, aggressive, block_store,
+                                             blocks)
+                return _manifest_result(filename, manifest, compliance_mode)
             
             # MODIFIED: Use the passed-in parameters for all text-based files
             redacted_text = redactor.redact(
                 original_text,
                 compliance_mode=compliance_mode,
                 agentic_level=agentic_level,
-                aggressive=aggressive
+                aggressive=aggressive,
+                block_store=block_store,
+                blocks=blocks
             )
             
         else:
@@ -209,6 +104,9 @@ async def handle_uploaded_file(file: UploadFile, compliance_mode: str, agentic_l
                 "status": "error"
             }
 
+        if response_mode == "download":
+            original_text = None
+
         return {
             "filename": filename,
             "original_text": original_text,
@@ -223,4 +121,181 @@ async def handle_uploaded_file(file: UploadFile, compliance_mode: str, agentic_l
             "filename": filename,
             "error": f"An error occurred while processing the file: {str(e)}",
             "status": "error"
-        }
\ No newline at end of file
+        }
+
+
+# --- Batch redaction ---
+# Documents are redacted in chunks so results can be streamed back while the
+# rest of the batch is still being processed.
+BATCH_CHUNK_SIZE = 64
+
+# Limits per zip archive, checked against the sizes in the archive's directory
+# before anything is decompressed. zipfile never returns more than a member's
+# declared size, so a member cannot expand past its entry.
+MAX_ZIP_MEMBERS = int(os.getenv("REDACTION_MAX_ZIP_MEMBERS", "1000"))
+MAX_ZIP_TOTAL_BYTES = int(os.getenv("REDACTION_MAX_ZIP_TOTAL_BYTES", str(200 * 1024 * 1024)))
+
+
+def expand_uploads(uploads):
+    """
+    Flattens (filename, content) pairs, replacing zip archives with their members.
+    Yields (filename, content, error); error is set for archives that cannot be
+    opened, for members that cannot be read (encrypted, corrupt, unsupported
+    compression) and for members beyond MAX_ZIP_MEMBERS or MAX_ZIP_TOTAL_BYTES,
+    which are skipped. A bad member never hides the members and uploads after it.
+    """
+    for filename, content in uploads:
+        if Path(filename).suffix.lower() != ".zip":
+            yield filename, content, None
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                members = 0
+                total_bytes = 0
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    member_name = f"{filename}/{info.filename}"
+                    if members >= MAX_ZIP_MEMBERS:
+                        yield member_name, None, f"Skipped: archive has more than {MAX_ZIP_MEMBERS} files"
+                        continue
+                    if total_bytes + info.file_size > MAX_ZIP_TOTAL_BYTES:
+                        yield member_name, None, (
+                            f"Skipped: archive expands to more than {MAX_ZIP_TOTAL_BYTES} bytes"
+                        )
+                        continue
+                    members += 1
+                    total_bytes += info.file_size
+                    try:
+                        member_content = archive.read(info)
+                    except (zipfile.BadZipFile, RuntimeError, NotImplementedError, zlib.error) as e:
+                        yield member_name, None, f"Cannot read archive member: {e}"
+                        continue
+                    yield member_name, member_content, None
+        except zipfile.BadZipFile as e:
+            yield filename, None, f"Invalid zip archive: {e}"
+
+
+def _collect_json_strings(data, strings):
+    if isinstance(data, dict):
+        for value in data.values():
+            _collect_json_strings(value, strings)
+    elif isinstance(data, list):
+        for item in data:
+            _collect_json_strings(item, strings)
+    elif isinstance(data, str):
+        strings.append(data)
+    return strings
+
+
+def _replace_json_strings(data, replacements):
+    if isinstance(data, dict):
+        return {k: _replace_json_strings(v, replacements) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_replace_json_strings(i, replacements) for i in data]
+    elif isinstance(data, str):
+        return next(replacements)
+    else:
+        return data
+
+
+def _prepare_batch_document(filename, content):
+    """Extracts the texts to redact for one batch document."""
+    file_suffix = Path(filename).suffix.lower()
+    if file_suffix == ".json":
+        data = json.loads(content)
+        texts = _collect_json_strings(data, [])
+        return {"filename": filename, "json": data, "texts": texts, "blocks": [None] * len(texts)}
+    elif file_suffix in TEXT_SUFFIXES:
+        text, blocks = extract_blocks(file_suffix, content)
+        return {"filename": filename, "texts": [text], "blocks": [blocks]}
+    raise ValueError(f"Unsupported file type: {file_suffix}")
+
+
+def _batch_result(document, redacted_texts, compliance_mode):
+    if "json" in document:
+        redacted_data = _replace_json_strings(document["json"], iter(redacted_texts))
+        original_text = json.dumps(document["json"], indent=2)
+        redacted_text = json.dumps(redacted_data, indent=2)
+    else:
+        original_text, redacted_text = document["texts"][0], redacted_texts[0]
+    return {
+        "filename": document["filename"],
+        "original_text": original_text,
+        "redacted_text": redacted_text,
+        "message": f"File redacted successfully with mode: {compliance_mode}",
+        "status": "success"
+    }
+
+
+def _batch_error(filename, message):
+    print(f"Error processing file {filename}: {message}")
+    return {
+        "filename": filename,
+        "error": f"An error occurred while processing the file: {message}",
+        "status": "error"
+    }
+
+
+def _redact_batch_chunk(documents, compliance_mode, agentic_level, aggressive):
+    """Runs detection for all documents of a chunk as one batched pass."""
+    texts = [text for document in documents for text in document["texts"]]
+    text_blocks = [blocks for document in documents for blocks in document["blocks"]]
+    try:
+        redacted = redactor.redact_batch(
+            texts,
+            compliance_mode=compliance_mode,
+            agentic_level=agentic_level,
+            aggressive=aggressive,
+            block_store=block_store,
+            text_blocks=text_blocks
+        )
+    except Exception:
+        # Retry document by document so one bad input does not fail the whole chunk
+        redacted = None
+
+    results = []
+    offset = 0
+    for document in documents:
+        count = len(document["texts"])
+        try:
+            if redacted is not None:
+                document_redacted = redacted[offset:offset + count]
+            else:
+                document_redacted = redactor.redact_batch(
+                    document["texts"],
+                    compliance_mode=compliance_mode,
+                    agentic_level=agentic_level,
+                    aggressive=aggressive,
+                    block_store=block_store,
+                    text_blocks=document["blocks"]
+                )
+            results.append(_batch_result(document, document_redacted, compliance_mode))
+        except Exception as e:
+            results.append(_batch_error(document["filename"], str(e)))
+        offset += count
+    return results
+
+
+def handle_batch(uploads, compliance_mode: str, agentic_level: float, aggressive: bool):
+    """
+    Redacts many (filename, content) uploads, expanding zip archives, and yields one
+    NDJSON line per file. Files that fail produce an error line instead of failing
+    the batch.
+    """
+    chunk = []
+    for filename, content, error in expand_uploads(uploads):
+        if error is None:
+            try:
+                chunk.append(_prepare_batch_document(filename, content))
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            yield (json.dumps(_batch_error(filename, error)) + "\n").encode("utf-8")
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            for result in _redact_batch_chunk(chunk, compliance_mode, agentic_level, aggressive):
+                yield (json.dumps(result) + "\n").encode("utf-8")
+            chunk = []
+    if chunk:
+        for result in _redact_batch_chunk(chunk, compliance_mode, agentic_level, aggressive):
+            yield (json.dumps(result) + "\n").encode("utf-8")
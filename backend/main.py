@@ -1,7 +1,14 @@
 # main.py
+import re
+from pathlib import Path
+from typing import List
+from urllib.parse import quote
+
 from fastapi import UploadFile, File, Form, HTTPException
-from logic import handle_uploaded_file
+from logic import handle_uploaded_file, handle_batch, RESPONSE_MODES
+from pii_engine import MANIFEST_ENCODINGS, encode_manifest
 from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
@@ -29,16 +36,38 @@ app.add_middleware(
 )
 
 # FIXED: Changed endpoint from /upload to /redact to match your frontend
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+def _iter_text_chunks(text):
+    for i in range(0, len(text), DOWNLOAD_CHUNK_SIZE):
+        yield text[i:i + DOWNLOAD_CHUNK_SIZE].encode("utf-8")
+
+def _attachment_header(filename):
+    """
+    Content-Disposition for a download. Headers are sent as latin-1, so the real
+    name goes in the RFC 5987 filename* parameter, after a plain ASCII fallback.
+    """
+    fallback = re.sub(r'[^A-Za-z0-9._-]', '_', filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
 @app.post("/redact")
 async def redact_file(
     file: UploadFile = File(...),
     mode: str = Form("DPDP"),
     level: float = Form(0.75),
-    aggressive: str = Form("false")
+    aggressive: str = Form("false"),
+    response_mode: str = Form("full"),
+    manifest_encoding: str = Form("json")
 ):
     """
     Receives a file and redaction parameters from the frontend.
+    response_mode="manifest" returns only the span manifest (encoded as json, gzip
+    or, when installed, msgpack); "download" streams the redacted body as a .txt file.
     """
+    if response_mode not in RESPONSE_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid response_mode. Use one of: {', '.join(RESPONSE_MODES)}")
+    if response_mode == "manifest" and manifest_encoding not in MANIFEST_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest_encoding. Use one of: {', '.join(MANIFEST_ENCODINGS)}")
     try:
         # Convert string to boolean safely
         aggressive_bool = aggressive.lower() in ('true', '1', 't', 'yes')
@@ -48,8 +77,21 @@ async def redact_file(
             file, 
             compliance_mode=mode, 
             agentic_level=level, 
-            aggressive=aggressive_bool
+            aggressive=aggressive_bool,
+            response_mode=response_mode
         )
+        if result["status"] != "success":
+            return result
+
+        if response_mode == "manifest":
+            body, media_type, headers = encode_manifest(result, manifest_encoding)
+            return Response(content=body, media_type=media_type, headers=headers)
+        if response_mode == "download":
+            return StreamingResponse(
+                _iter_text_chunks(result["redacted_text"]),
+                media_type="text/plain; charset=utf-8",
+                headers={"Content-Disposition": _attachment_header(f"redacted_{Path(file.filename).stem}.txt")}
+            )
         
         return result
         
@@ -63,12 +105,33 @@ async def upload_file(
     file: UploadFile = File(...),
     mode: str = Form("DPDP"),
     level: float = Form(0.75),
-    aggressive: str = Form("false")
+    aggressive: str = Form("false"),
+    response_mode: str = Form("full"),
+    manifest_encoding: str = Form("json")
 ):
     """
     Alternative endpoint - redirects to redact_file
     """
-    return await redact_file(file, mode, level, aggressive)
+    return await redact_file(file, mode, level, aggressive, response_mode, manifest_encoding)
+
+@app.post("/redact/batch")
+async def redact_batch(
+    files: List[UploadFile] = File(...),
+    mode: str = Form("DPDP"),
+    level: float = Form(0.75),
+    aggressive: str = Form("false")
+):
+    """
+    Receives many files (and/or zip archives of files) in one request and streams
+    back one NDJSON line per file. Detection runs as a batched pass across files.
+    """
+    aggressive_bool = aggressive.lower() in ('true', '1', 't', 'yes')
+    # Read everything up front; the upload files are closed once this handler returns
+    uploads = [(file.filename, await file.read()) for file in files]
+    return StreamingResponse(
+        handle_batch(uploads, compliance_mode=mode, agentic_level=level, aggressive=aggressive_bool),
+        media_type="application/x-ndjson"
+    )
 
 @app.get("/")
 def read_root():
@@ -76,6 +139,7 @@ def read_root():
         "message": "Welcome to the AI Redaction API", 
         "endpoints": {
             "/redact": "POST - Upload and redact files",
+            "/redact/batch": "POST - Redact many files or zip archives, streamed as NDJSON",
             "/upload": "POST - Alternative upload endpoint",
             "/health": "GET - Health check"
         }
@@ -0,0 +1,180 @@
+# serve.py
+# Pre-fork server for the redaction API.
+#
+# The parent imports the app and loads the PIIRedactor's roberta-large weights
+# once, then forks the workers. Everything the parent built (torch, the model,
+# the tokenizer, the app) lives in pages the workers share copy-on-write instead
+# of each building its own. The README has measured numbers. Workers that die
+# while serving are replaced.
+#
+#   python serve.py --workers 4
+#   python serve.py --workers 4 --report-memory               # RSS/PSS/USS per worker
+#   python serve.py --workers 4 --report-memory --no-preload  # before: one model per worker
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+# A worker that dies sooner than this after being forked is not replaced, so a
+# worker that cannot start does not turn into a fork loop.
+MIN_WORKER_UPTIME = 10.0
+
+
+def memory_kib(pid):
+    """Returns (rss, pss, uss) in KiB for a process, read from /proc."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), uss
+
+
+def report_memory(parent_pid, worker_pids):
+    print(f"{'process':<16}{'RSS MiB':>10}{'PSS MiB':>10}{'USS MiB':>10}")
+    rows = [("parent", parent_pid)] + [(f"worker {i}", pid) for i, pid in enumerate(worker_pids)]
+    total_pss = 0
+    for label, pid in rows:
+        usage = memory_kib(pid)
+        if usage is None:
+            print(f"{label:<16}{'n/a':>10}")
+            continue
+        rss, pss, uss = usage
+        total_pss += pss
+        print(f"{label:<16}{rss / 1024:>10.0f}{pss / 1024:>10.0f}{uss / 1024:>10.0f}")
+    # PSS splits shared pages between the processes mapping them, so the sum is the real footprint
+    print(f"{'total (PSS)':<16}{total_pss / 1024:>10.0f}")
+
+
+def run_worker(sock, threads):
+    # Already imported and loaded in the parent when preloading; loads a private model otherwise
+    from main import app
+    import logic
+    logic.redactor.ner.load()
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    config = uvicorn.Config(app, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(sock, threads):
+    """Forks a worker; it exits with status 1 if run_worker raises."""
+    pid = os.fork()
+    if pid == 0:
+        # Drop the parent's shutdown handlers; uvicorn installs its own
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        status = 0
+        try:
+            run_worker(sock, threads)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+    return pid
+
+
+def describe_exit(status):
+    if os.WIFSIGNALED(status):
+        return f"killed by signal {os.WTERMSIG(status)}"
+    return f"exited with status {os.WEXITSTATUS(status)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the AI Redaction API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Load the model in each worker instead of once in the parent")
+    parser.add_argument("--report-memory", type=float, nargs="?", const=30.0, metavar="SECONDS",
+                        help="Print per-process memory after SECONDS (default 30), once workers have loaded")
+    args = parser.parse_args()
+    preload = not args.no_preload
+
+    if preload:
+        print("Preloading model in the parent process...")
+        import logic
+        if logic.redactor.ner.load().device.type != "cpu":
+            # CUDA contexts do not survive fork(); each GPU worker needs its own process start.
+            sys.exit("Pre-fork serving needs the model on CPU. Use --no-preload for GPU workers.")
+        import main  # noqa: F401  (build the app before forking too)
+        # Move everything allocated so far out of the GC's reach so collections in
+        # the workers do not touch (and copy) the shared pages.
+        gc.collect()
+        gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    # pid -> time the worker was forked
+    workers = {}
+    for _ in range(args.workers):
+        workers[spawn_worker(sock, threads)] = time.monotonic()
+
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers "
+          f"({'shared' if preload else 'per-worker'} model)")
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    if args.report_memory is not None:
+        time.sleep(args.report_memory)
+        report_memory(os.getpid(), list(workers))
+
+    # Replace workers that die while serving; a clean exit only happens on shutdown
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        uptime = time.monotonic() - started
+        print(f"Worker {pid} {describe_exit(status)} after {uptime:.0f}s.", file=sys.stderr)
+        if uptime < MIN_WORKER_UPTIME:
+            print(f"Not replacing it: it died within {MIN_WORKER_UPTIME:.0f}s of starting. "
+                  f"{len(workers)} worker(s) left.", file=sys.stderr)
+            continue
+        workers[spawn_worker(sock, threads)] = time.monotonic()
+    sock.close()
+    if not stopping:
+        sys.exit("No workers left.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# benchmark.py
+# Micro-benchmarks for the redaction pipeline.
+#
+#   python benchmark.py pdf [--pages 500] [--boxes 3000]
+#   python benchmark.py gate [--input sample.txt] [--model Jean-Baptiste/roberta-large-ner-english]
+#   python benchmark.py llm-cache [--input sample.txt] [--pages 20] [--latency 0.2]
+#   python benchmark.py hybrid [--input sample.txt] [--mode DPDP] [--level 0.75]
+#   python benchmark.py manifest [--input sample.txt] [--size-mb 10]
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+
+def _build_pdf(path, pages):
+    """Write a synthetic PDF with mixed page sizes and a line of text per page."""
+    from reportlab.lib.pagesizes import A4, letter, landscape
+    from reportlab.pdfgen import canvas
+
+    sizes = [letter, A4, landscape(A4)]
+    can = canvas.Canvas(path)
+    for i in range(pages):
+        can.setPageSize(sizes[i % len(sizes)])
+        can.drawString(72, 720, f"Page {i + 1}: Jane Doe, jane.doe@examplecorp.com, +91 98765 43210")
+        can.showPage()
+    can.save()
+
+
+def _random_boxes(pages, count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {'page': rng.randrange(pages), 'x': rng.uniform(50, 400), 'y': rng.uniform(50, 700),
+         'width': rng.uniform(20, 120), 'height': 12}
+        for _ in range(count)
+    ]
+
+
+def _legacy_pdf_redaction(input_path, output_path, redaction_boxes):
+    """The previous per-page implementation, kept here as the baseline."""
+    from PyPDF2 import PdfReader, PdfWriter
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    reader = PdfReader(input_path)
+    writer = PdfWriter()
+    for page_num, page in enumerate(reader.pages):
+        writer.add_page(page)
+        packet = io.BytesIO()
+        can = canvas.Canvas(packet, pagesize=letter)
+        can.setFillColorRGB(0, 0, 0)
+        for box in redaction_boxes:
+            if box.get('page') == page_num:
+                can.rect(box['x'], box['y'], box['width'], box['height'], fill=1)
+        can.save()
+        packet.seek(0)
+        overlay = PdfReader(packet)
+        writer.pages[page_num].merge_page(overlay.pages[0])
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+
+
+def bench_pdf(args):
+    from test import apply_pdf_redaction
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.pdf")
+        _build_pdf(source, args.pages)
+        # Concentrate boxes on a subset of pages so the skip path is exercised
+        boxes = _random_boxes(args.pages // 3 or 1, args.boxes)
+
+        for label, fn in (("legacy", _legacy_pdf_redaction), ("grouped", apply_pdf_redaction)):
+            out = os.path.join(tmp, f"{label}.pdf")
+            start = time.perf_counter()
+            fn(source, out, boxes)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>8}: {elapsed:8.3f}s  ({args.pages} pages, {len(boxes)} boxes, "
+                  f"{os.path.getsize(out) / 1024:.0f} KiB)")
+
+
+def _entity_key(entity):
+    return (entity['entity_group'], entity['start'], entity['end'])
+
+
+def bench_gate(args):
+    """Run NER over every line of the input without the pre-NER gate, with the
+    default (exact) gate and with the heuristic gate.
+
+    Lines stand in for JSON leaves and DOCX paragraphs. The recall check compares
+    the entities found with each gate against the ungated run; any entity a gate
+    drops is listed.
+    """
+    from pii_engine import PIIRedactor
+
+    with open(args.input, encoding="utf-8") as f:
+        units = f.read().split("\n")
+    redactor = PIIRedactor(model_name=args.model)
+    ner = redactor.ner
+
+    results = {}
+    for label, gated, heuristics in (("ungated", False, False), ("exact", True, False), ("heuristic", True, True)):
+        ner.ner_gate = gated
+        ner.ner_heuristics = heuristics
+        ner.ner_calls = ner.ner_skipped = 0
+        ner._seen_safe.clear()
+        start = time.perf_counter()
+        found = [{_entity_key(e) for e in redactor.detect_pii(unit)} for unit in units]
+        elapsed = time.perf_counter() - start
+        results[label] = found
+        print(f"{label:>9}: {elapsed:8.3f}s  NER calls {ner.ner_calls}, skipped {ner.ner_skipped} "
+              f"of {len(units)} units")
+
+    total = sum(len(found) for found in results["ungated"])
+    for label in ("exact", "heuristic"):
+        lost = [(i, sorted(full - gated)) for i, (full, gated) in enumerate(zip(results["ungated"], results[label]))
+                if full - gated]
+        print(f"  {label} recall: {total - sum(len(l) for _, l in lost)}/{total} entities kept")
+        for line_no, entities in lost:
+            print(f"    line {line_no + 1}: lost {entities}")
+
+
+def bench_llm_cache(args):
+    """Push a paginated document through the cached chain with the offline backend.
+
+    Every page carries the same header and footer and the body paragraphs cycle,
+    as in a long report, so repeated inputs are answered from the cache.
+    """
+    from pii_engine import CachedRedactionChain, LocalRedactionChain, ResponseCache
+
+    with open(args.input, encoding="utf-8") as f:
+        paragraphs = [p for p in f.read().split("\n\n") if p.strip()]
+    header = "CONFIDENTIAL - Internal Review - Example Corp"
+    footer = "Contact compliance@examplecorp.com or +91 98765 43210 with questions."
+    units = []
+    for page in range(args.pages):
+        units += [header, paragraphs[page % len(paragraphs)], footer]
+
+    entity_types = "names, emails, phones"
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "llm_cache.sqlite3"))
+        chain = CachedRedactionChain(LocalRedactionChain(latency=args.latency), model="local", cache=cache)
+        start = time.perf_counter()
+        for unit in units:
+            chain.invoke({"document_text": unit, "entity_types": entity_types})
+        elapsed = time.perf_counter() - start
+        cache.close()
+
+    stats = chain.stats()
+    uncached = len(units) * args.latency
+    print(f"  {len(units)} chain calls: {stats['hits']} hits, {stats['misses']} misses "
+          f"(hit rate {stats['hit_rate']:.0%})")
+    print(f"  wall time {elapsed:.3f}s vs ~{uncached:.3f}s uncached; "
+          f"saved {stats['saved_seconds']:.3f}s ({stats['saved_seconds'] / len(units) * 1000:.1f} ms per call)")
+
+
+def bench_hybrid(args):
+    """Compare LLM input volume of the hybrid engine against sending the whole document.
+
+    Runs with the offline backends, so it measures routing (how much text reaches
+    the LLM), not Gemini's answers.
+    """
+    os.environ["REDACTION_LLM_BACKEND"] = "local"
+    from pii_engine import (
+        CachedRedactionChain, HybridRedactor, LocalRedactionChain, PIIRedactor, ResponseCache, get_adjudication_chain,
+    )
+
+    with open(args.input, encoding="utf-8") as f:
+        text = f.read()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "llm_cache.sqlite3"))
+        region_chain = CachedRedactionChain(LocalRedactionChain(), model="local", cache=cache)
+        hybrid = HybridRedactor(PIIRedactor(), get_adjudication_chain(None, "local", cache=cache))
+        start = time.perf_counter()
+        hybrid.redact(text, compliance_mode=args.mode, agentic_level=args.level, region_chain=region_chain,
+                      entity_types="names, emails, phones")
+        elapsed = time.perf_counter() - start
+        cache.close()
+
+    stats = hybrid.last_stats
+    ratio = stats["document_chars"] / stats["llm_chars"] if stats["llm_chars"] else float("inf")
+    print(f"  full-document LLM input: {stats['document_chars']} chars in 1 call")
+    print(f"  hybrid LLM input:        {stats['llm_chars']} chars in {stats['llm_calls']} calls "
+          f"({ratio:.1f}x less)")
+    print(f"  adjudicated {stats['adjudicated']} spans, {stats['ambiguous_regions']} ambiguous regions, "
+          f"{elapsed:.3f}s")
+
+
+def bench_manifest(args):
+    """Compare response size and serialization time: full text payload vs span manifest.
+
+    Detection uses the regex detector only; the response shape, not NER, is measured.
+    """
+    import json
+
+    from pii_engine import PIIRedactor, RegexDetector, encode_manifest, render_redaction
+
+    with open(args.input, encoding="utf-8") as f:
+        sample = f.read()
+    text = sample * max(1, int(args.size_mb * 1024 * 1024 // len(sample)))
+    redactor = PIIRedactor(detectors=[RegexDetector()])
+    redacted_text = redactor.redact(text)
+    manifest = redactor.manifest(text)
+    assert render_redaction(text, manifest) == redacted_text, "manifest does not reproduce redact()"
+
+    full = {"filename": "bench.txt", "original_text": text, "redacted_text": redacted_text, "status": "success"}
+    start = time.perf_counter()
+    full_body = json.dumps(full).encode("utf-8")
+    elapsed = time.perf_counter() - start
+    print(f"{'full':>9}: {len(full_body) / 1024:10.1f} KiB  {elapsed * 1000:8.1f} ms")
+
+    payload = {"filename": "bench.txt", "manifest": manifest, "status": "success"}
+    for encoding in ("json", "gzip", "msgpack"):
+        start = time.perf_counter()
+        try:
+            body, _, _ = encode_manifest(payload, encoding)
+        except ValueError as e:
+            print(f"{encoding:>9}: skipped ({e})")
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{encoding:>9}: {len(body) / 1024:10.1f} KiB  {elapsed * 1000:8.1f} ms  "
+              f"({len(manifest['gaps'])} spans)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redaction pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pdf = sub.add_parser("pdf", help="PDF overlay writer")
+    pdf.add_argument("--pages", type=int, default=500)
+    pdf.add_argument("--boxes", type=int, default=3000)
+    pdf.set_defaults(func=bench_pdf)
+
+    gate = sub.add_parser("gate", help="Pre-NER gate: skipped calls and recall check")
+    gate.add_argument("--input", default="sample.txt")
+    gate.add_argument("--model", default="Jean-Baptiste/roberta-large-ner-english")
+    gate.set_defaults(func=bench_gate)
+
+    llm_cache = sub.add_parser("llm-cache", help="LLM response cache hit rate with the offline backend")
+    llm_cache.add_argument("--input", default="sample.txt")
+    llm_cache.add_argument("--pages", type=int, default=20)
+    llm_cache.add_argument("--latency", type=float, default=0.2, help="Emulated seconds per LLM call")
+    llm_cache.set_defaults(func=bench_llm_cache)
+
+    hybrid = sub.add_parser("hybrid", help="LLM input volume of the hybrid engine")
+    hybrid.add_argument("--input", default="sample.txt")
+    hybrid.add_argument("--mode", default="DPDP")
+    hybrid.add_argument("--level", type=float, default=0.75)
+    hybrid.set_defaults(func=bench_hybrid)
+
+    manifest = sub.add_parser("manifest", help="Full-text response vs span manifest size")
+    manifest.add_argument("--input", default="sample.txt")
+    manifest.add_argument("--size-mb", type=float, default=10)
+    manifest.set_defaults(func=bench_manifest)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,20 @@
 
 import os
 import io
-import docx
-import fitz  # PyMuPDF
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from pii_engine import (
+    COMPLIANCE_MAP,
+    HybridRedactor,
+    PIIRedactor,
+    ResponseCache,
+    get_adjudication_chain,
+    get_redaction_chain as build_redaction_chain,
+    load_gemini,
+    offline_mode,
+)
 
 # --- Initialization ---
 load_dotenv()
@@ -26,44 +31,60 @@ app.add_middleware(
 
 # --- Global Variables & Model Loading ---
 LLM = None
-try:
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in .env file.")
-    LLM = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0, google_api_key=api_key)
-    print("✅ Gemini model initialized successfully.")
-except Exception as e:
-    print(f"❌ Critical Error: Could not initialize Gemini model. {e}")
-
-COMPLIANCE_MAP = {
-    "gdpr": ["names", "emails", "phones", "physical mailing addresses", "IP addresses", "social security numbers", "passport numbers"],
-    "hipaa": ["names", "dates", "phone numbers", "emails", "social security numbers", "medical record numbers"],
-    "dpdp": ["names", "emails", "phones", "addresses", "Aadhaar numbers", "PAN numbers", "financial data"]
-}
+LLM_MODEL = "gemini-1.5-flash"
+if not offline_mode():
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in .env file.")
+        LLM = load_gemini(LLM_MODEL, api_key=api_key)
+        print("✅ Gemini model initialized successfully.")
+    except Exception as e:
+        print(f"❌ Critical Error: Could not initialize Gemini model. {e}")
+
+# Identical inputs (repeated headers, footers, boilerplate pages) are answered from here.
+# Opened on the first request rather than at import.
+RESPONSE_CACHE = None
+
+def get_response_cache():
+    global RESPONSE_CACHE
+    if RESPONSE_CACHE is None:
+        RESPONSE_CACHE = ResponseCache()
+    return RESPONSE_CACHE
 
 # --- Core Redaction Logic ---
 def get_redaction_chain(entity_types: list):
-    """Creates a LangChain chain for a given set of PII types."""
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", """You are an AI assistant that redacts Personally Identifiable Information (PII).
-        - Detect these PII types: {entity_types}
-        - Replace each PII instance with "[REDACTED]".
-        - Return only the redacted text, preserving original structure and line breaks."""),
-        ("human", "Document Text:\n---\n{document_text}\n---")
-    ])
-    return prompt_template | LLM | StrOutputParser()
+    """Creates a cached LangChain chain for a given set of PII types."""
+    return build_redaction_chain(LLM, LLM_MODEL, cache=get_response_cache())
+
+# --- Hybrid engine: local regex + NER first, Gemini only for low-confidence spans ---
+LOCAL_REDACTOR = None
+
+def get_hybrid_redactor():
+    """
+    Builds a per-request hybrid redactor, so its chain counters cover one request.
+    The local NER engine is loaded on first use so the LLM-only path stays light.
+    Downloads must not quote unreviewed PII, so unclear verdicts are redacted.
+    """
+    global LOCAL_REDACTOR
+    if LOCAL_REDACTOR is None:
+        LOCAL_REDACTOR = PIIRedactor()
+    return HybridRedactor(LOCAL_REDACTOR, get_adjudication_chain(LLM, LLM_MODEL, cache=get_response_cache()),
+                          fail_closed=True)
 
 # --- API Endpoint ---
 @app.post("/redact-file")
 async def redact_file(
     compliance_mode: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    engine: str = Form("llm")
 ):
     """
     Receives a file, redacts it based on its type and compliance mode,
-    and returns the redacted file.
+    and returns the redacted file. engine="hybrid" runs the local engine
+    first and only sends low-confidence spans to the LLM.
     """
-    if not LLM:
+    if not LLM and not offline_mode():
         raise HTTPException(status_code=500, detail="LLM not initialized.")
 
     entity_types = COMPLIANCE_MAP.get(compliance_mode)
@@ -71,6 +92,19 @@ async def redact_file(
         raise HTTPException(status_code=400, detail="Invalid compliance mode.")
 
     chain = get_redaction_chain(entity_types)
+    chains = [chain]
+    if engine == "hybrid":
+        hybrid = get_hybrid_redactor()
+        chains.append(hybrid.adjudication_chain)
+        def redact_text(text):
+            return hybrid.redact(text, compliance_mode=compliance_mode.upper(), region_chain=chain,
+                                 entity_types=", ".join(entity_types))
+    elif engine == "llm":
+        def redact_text(text):
+            return chain.invoke({"document_text": text, "entity_types": ", ".join(entity_types)})
+    else:
+        raise HTTPException(status_code=400, detail="Invalid engine.")
+
     file_content = await file.read()
     file_extension = os.path.splitext(file.filename)[1].lower()
 
@@ -78,13 +112,14 @@ async def redact_file(
     if file_extension == ".pdf":
         # True PDF redaction: add black boxes
         try:
+            import fitz  # PyMuPDF
             doc = fitz.open(stream=file_content, filetype="pdf")
             for page in doc:
                 text = page.get_text("text")
                 if text.strip():
                     # To find PII to redact, we first get a list from the LLM
                     # A more advanced approach would be to get PII and its context
-                    redacted_page_text = chain.invoke({"document_text": text, "entity_types": ", ".join(entity_types)})
+                    redacted_page_text = redact_text(text)
                     # This is a simplified approach: find text differences
                     # A robust solution would use fuzzy matching or coordinate-based redaction
                     # For this example, we'll redact the whole page if PII is found.
@@ -107,10 +142,11 @@ async def redact_file(
     elif file_extension == ".docx":
         # Edit DOCX paragraphs
         try:
+            import docx
             doc = docx.Document(io.BytesIO(file_content))
             for para in doc.paragraphs:
                 if para.text.strip():
-                    redacted_text = chain.invoke({"document_text": para.text, "entity_types": ", ".join(entity_types)})
+                    redacted_text = redact_text(para.text)
                     para.text = redacted_text
             
             output_buffer = io.BytesIO()
@@ -125,7 +161,7 @@ async def redact_file(
         # Simple text redaction
         try:
             text = file_content.decode('utf-8')
-            redacted_text = chain.invoke({"document_text": text, "entity_types": ", ".join(entity_types)})
+            redacted_text = redact_text(text)
             output_buffer = io.BytesIO(redacted_text.encode('utf-8'))
             media_type = "text/plain"
 
@@ -135,8 +171,13 @@ async def redact_file(
     else:
         raise HTTPException(status_code=400, detail="Unsupported file type.")
 
+    # Covers the redaction chain and, for the hybrid engine, the adjudication chain
+    cache_stats = [c.stats() for c in chains]
     return StreamingResponse(output_buffer, media_type=media_type, headers={
-        "Content-Disposition": f"attachment; filename=redacted_{file.filename}"
+        "Content-Disposition": f"attachment; filename=redacted_{file.filename}",
+        "X-LLM-Cache-Hits": str(sum(s["hits"] for s in cache_stats)),
+        "X-LLM-Cache-Misses": str(sum(s["misses"] for s in cache_stats)),
+        "X-LLM-Cache-Saved-Seconds": str(round(sum(s["saved_seconds"] for s in cache_stats), 3)),
     })
 
 @app.get("/")
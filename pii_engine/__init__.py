@@ -0,0 +1,23 @@
+# pii_engine
+# One redaction engine for the CLI, the root API and backend/.
+#
+# Importing the package is cheap: transformers, PyMuPDF, python-docx and
+# langchain are only imported once a detector or file format that needs them
+# is actually used.
+
+from .detectors import LLM_ENTITY_GROUP, Detector, LLMDetector, NERDetector, RegexDetector
+from .formats import TEXT_SUFFIXES, extract_blocks, extract_text
+from .hybrid import HybridRedactor, get_adjudication_chain
+from .llm import (
+    COMPLIANCE_MAP,
+    CachedRedactionChain,
+    LocalAdjudicationChain,
+    LocalRedactionChain,
+    ResponseCache,
+    get_redaction_chain,
+    load_gemini,
+    offline_mode,
+)
+from .manifest import MANIFEST_ENCODINGS, build_manifest, decode_manifest, encode_manifest, render_redaction
+from .redactor import PIIRedactor
+from .store import BlockStore, split_blocks
@@ -0,0 +1,219 @@
+# pii_engine/detectors.py
+# Pluggable PII detectors. Every detector returns spans in the same shape:
+#
+#   {'entity_group': str, 'score': float, 'word': str, 'start': int, 'end': int}
+#
+# with offsets into the text it was given. PIIRedactor merges the spans of all
+# its detectors and resolves overlaps by entity priority.
+
+import difflib
+import json
+import re
+
+# First letter of every word, in any script.
+WORD_START = re.compile(r'\b[^\W\d_]')
+
+# Spans found by LLMDetector carry this group; the chain already knows which
+# types the compliance mode asks for.
+LLM_ENTITY_GROUP = "PII"
+
+
+def has_capitalized_token(text):
+    """
+    True if any word starts with an uppercase letter (É, Ж, ...) or with a letter
+    from a script without case (Devanagari, CJK, ...), where casing says nothing.
+    """
+    return any(not match.group().islower() for match in WORD_START.finditer(text))
+
+
+def make_span(entity_group, score, text, start, end):
+    return {'entity_group': entity_group, 'score': score, 'word': text[start:end], 'start': start, 'end': end}
+
+
+class Detector:
+    """Base class for detectors. Subclasses implement detect(); detect_batch() may be overridden."""
+    name = "detector"
+
+    def detect(self, text):
+        raise NotImplementedError
+
+    def detect_batch(self, texts):
+        return [self.detect(text) for text in texts]
+
+    def signature(self):
+        """Identifies the detector and every setting that changes its output."""
+        return self.name
+
+
+class RegexDetector(Detector):
+    name = "regex"
+
+    def __init__(self, patterns=None):
+        if patterns is None:
+            phone_regex = r"""
+                \b
+                (?:(?:\+91|0)[\s-]?)?[6-9]\d{2}[\s-]?\d{3}[\s-]?\d{4}\b|
+                \b0\d{2,4}[\s-]?\d{6,8}\b
+            """
+            patterns = {
+                "EMAIL": re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'),
+                "PHONE": re.compile(phone_regex, re.VERBOSE),
+                "AADHAAR": re.compile(r'\b[2-9]\d{3}\s?\d{4}\s?\d{4}\b'),
+                "PAN_CARD": re.compile(r'\b[A-Z]{5}\d{4}[A-Z]{1}\b'),
+                # Deliberately greedy; ACCOUNT_NO has the lowest priority when resolving overlaps.
+                "ACCOUNT_NO": re.compile(r'\b\d{9,18}\b'),
+            }
+        self.patterns = patterns
+
+    def detect(self, text):
+        spans = []
+        for entity_type, pattern in self.patterns.items():
+            for match in pattern.finditer(text):
+                spans.append(make_span(entity_type, 1.0, text, match.start(), match.end()))
+        return spans
+
+    def signature(self):
+        patterns = [(entity_type, pattern.pattern, pattern.flags) for entity_type, pattern in self.patterns.items()]
+        return f"{self.name}:{json.dumps(patterns)}"
+
+
+class NERDetector(Detector):
+    """
+    Transformer NER behind a cheap gate. The model (and transformers itself) is
+    loaded on first use; call load() to do it up front, e.g. before forking workers.
+    """
+    name = "ner"
+
+    def __init__(self, model_name="Jean-Baptiste/roberta-large-ner-english", batch_size=8):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._pipeline = None
+
+        # Cheap gate in front of NER. Text that fails it only goes through the other detectors.
+        # The default gate only skips blank text and exact repeats NER found nothing in,
+        # so it cannot lose entities. ner_heuristics also skips short text and text with
+        # no capitalised word; its recall has not been measured for the default model.
+        self.ner_gate = True
+        self.ner_heuristics = False
+        self.ner_min_length = 3
+        self.ner_calls = 0
+        self.ner_skipped = 0
+        self.seen_safe_limit = 10000
+        self._seen_safe = set()
+
+    def load(self):
+        if self._pipeline is None:
+            from transformers import pipeline
+
+            print(f"Loading NER model ({self.model_name})... This might take a moment.")
+            # device=0 uses the GPU when CUDA is set up; otherwise fall back to CPU.
+            try:
+                self._pipeline = pipeline("ner", model=self.model_name, grouped_entities=True, device=0)
+                print("NER model loaded on GPU.")
+            except Exception:
+                print("GPU not available or CUDA not set up correctly. Loading NER model on CPU.")
+                self._pipeline = pipeline("ner", model=self.model_name, grouped_entities=True)
+                print("NER model loaded on CPU.")
+        return self._pipeline
+
+    @property
+    def pipeline(self):
+        return self.load()
+
+    def signature(self):
+        if not self.ner_gate:
+            gate = "off"
+        elif self.ner_heuristics:
+            gate = f"heuristic:{self.ner_min_length}"
+        else:
+            gate = "exact"
+        return f"{self.name}:{self.model_name}:gate={gate}"
+
+    def _needs_ner(self, text):
+        """
+        Decides whether text can contain a PER/ORG/LOC entity at all. Blank text and
+        text that NER already returned nothing for are skipped. With ner_heuristics,
+        short strings and text whose words all start with a lowercase letter are
+        skipped too.
+        """
+        if not self.ner_gate:
+            return True
+        if not text.strip():
+            return False
+        if self.ner_heuristics:
+            if len(text.strip()) < self.ner_min_length or not has_capitalized_token(text):
+                return False
+        return text not in self._seen_safe
+
+    def _remember_safe(self, text):
+        if len(self._seen_safe) >= self.seen_safe_limit:
+            self._seen_safe.clear()
+        self._seen_safe.add(text)
+
+    @staticmethod
+    def _to_spans(results):
+        return [
+            {'entity_group': e['entity_group'], 'score': float(e['score']), 'word': e['word'],
+             'start': e['start'], 'end': e['end']}
+            for e in results
+        ]
+
+    def detect(self, text):
+        if not self._needs_ner(text):
+            self.ner_skipped += 1
+            return []
+        self.ner_calls += 1
+        results = self.pipeline(text)
+        if not results:
+            self._remember_safe(text)
+        return self._to_spans(results)
+
+    def detect_batch(self, texts):
+        """
+        One batched NER pass over the distinct texts that pass the gate.
+        Results come back in the same order as texts.
+        """
+        pending = {}
+        for i, text in enumerate(texts):
+            if self._needs_ner(text):
+                pending.setdefault(text, []).append(i)
+            else:
+                self.ner_skipped += 1
+        spans = [[] for _ in texts]
+        if pending:
+            unique_texts = list(pending)
+            self.ner_calls += len(unique_texts)
+            outputs = self.pipeline(unique_texts, batch_size=self.batch_size)
+            for text, output in zip(unique_texts, outputs):
+                if not output:
+                    self._remember_safe(text)
+                for i in pending[text]:
+                    spans[i] = self._to_spans(output)
+        return spans
+
+
+class LLMDetector(Detector):
+    """
+    Turns a redaction chain (see pii_engine.llm) into a span detector: the chain's
+    redacted output is diffed against the input and every replaced stretch becomes
+    a span labelled LLM_ENTITY_GROUP.
+    """
+    name = "llm"
+
+    def __init__(self, chain, entity_types, score=1.0):
+        self.chain = chain
+        self.entity_types = entity_types
+        self.score = score
+
+    def signature(self):
+        model = getattr(self.chain, "model", type(self.chain).__name__)
+        return f"{self.name}:{model}:{self.entity_types}:{self.score}"
+
+    def detect(self, text):
+        redacted = self.chain.invoke({"document_text": text, "entity_types": self.entity_types})
+        matcher = difflib.SequenceMatcher(None, text, redacted, autojunk=False)
+        spans = []
+        for tag, i1, i2, _, _ in matcher.get_opcodes():
+            if tag in ("replace", "delete") and text[i1:i2].strip():
+                spans.append(make_span(LLM_ENTITY_GROUP, self.score, text, i1, i2))
+        return spans
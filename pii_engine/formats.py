@@ -0,0 +1,45 @@
+# pii_engine/formats.py
+# Text extraction per upload format. The parsers are imported only when a file
+# of that format shows up.
+
+import io
+
+from .store import split_blocks
+
+TEXT_SUFFIXES = [".txt", ".docx", ".pdf"]
+
+
+def _join_blocks(parts, separator):
+    """Joins parts with separator and returns (text, blocks) with one block per part."""
+    blocks = []
+    offset = 0
+    for part in parts:
+        blocks += [(offset + start, block) for start, block in split_blocks(part)]
+        offset += len(part) + len(separator)
+    return separator.join(parts), blocks
+
+
+def extract_blocks(file_suffix, content):
+    """
+    Extracts plain text like extract_text and returns (text, blocks), where blocks
+    are (offset, block) pairs for PIIRedactor. DOCX paragraphs and PDF pages are
+    blocks of their own (split further on blank lines); plain text is split on
+    blank lines only.
+    """
+    if file_suffix == ".txt":
+        text = content.decode("utf-8", errors="ignore")
+        return text, split_blocks(text)
+    elif file_suffix == ".docx":
+        import docx
+        doc = docx.Document(io.BytesIO(content))
+        return _join_blocks([para.text for para in doc.paragraphs], "\n")
+    elif file_suffix == ".pdf":
+        import fitz  # PyMuPDF
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            return _join_blocks([page.get_text() for page in doc], "")
+    raise ValueError(f"Unsupported file type: {file_suffix}")
+
+
+def extract_text(file_suffix, content):
+    """Extracts plain text from .txt, .docx or .pdf file content."""
+    return extract_blocks(file_suffix, content)[0]
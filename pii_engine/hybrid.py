@@ -0,0 +1,146 @@
+# pii_engine/hybrid.py
+# Tiered redaction: the local regex + NER engine runs first and Gemini only sees
+# the small context windows it is unsure about.
+#
+# - Entities scoring at or above agentic_level are redacted locally.
+# - Entities scoring below it are sent, with a little context, to an adjudication
+#   chain that answers YES/NO. Unclear answers or failed calls fall back to the
+#   usual [NEEDS_REVIEW: ...] marker.
+# - Lines that carry a PII cue (SSN, IBAN, date of birth, ...) and digits but no
+#   detected entity are sent to the regular redaction chain.
+# All LLM calls for a document run concurrently.
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .llm import CachedRedactionChain, LocalAdjudicationChain, offline_mode
+
+AMBIGUOUS_CUES = re.compile(
+    r'\b(?:ssn|social security|iban|swift|passport|date of birth|dob|account|card|'
+    r'licen[cs]e|medical record|mrn|aadhaar|pan)\b',
+    re.IGNORECASE,
+)
+LINE = re.compile(r'[^\n]+')
+# Whole-word YES/NO, so answers like "Not sure" stay unclear
+VERDICT = re.compile(r'(YES|NO)\b')
+
+ADJUDICATION_PROMPT = [
+    ("system", """You are an AI assistant that reviews candidate Personally Identifiable Information (PII).
+        - The candidate span is wrapped in <<< >>> in the text below.
+        - Decide whether the span is PII of this type: {entity_types}
+        - Answer with exactly YES or NO."""),
+    ("human", "Context:\n---\n{document_text}\n---")
+]
+
+
+def get_adjudication_chain(llm, model, cache=None):
+    """Creates a cached chain that answers YES/NO for one marked candidate span."""
+    if offline_mode():
+        return CachedRedactionChain(LocalAdjudicationChain(), model="local:adjudicate", cache=cache)
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
+    prompt_template = ChatPromptTemplate.from_messages(ADJUDICATION_PROMPT)
+    # Namespaced model so verdicts never collide with redaction responses in a shared cache
+    return CachedRedactionChain(prompt_template | llm | StrOutputParser(), model=f"{model}:adjudicate", cache=cache,
+                                prompt_messages=ADJUDICATION_PROMPT)
+
+
+class HybridRedactor:
+    """
+    With fail_closed=True, spans without a clear verdict are redacted instead of
+    quoted in a review marker, and ambiguous regions whose LLM call failed are
+    replaced with [REDACTED], so unreviewed PII never reaches the output.
+    """
+    def __init__(self, redactor, adjudication_chain, context_chars=60, max_concurrency=8, fail_closed=False):
+        self.redactor = redactor
+        self.adjudication_chain = adjudication_chain
+        self.fail_closed = fail_closed
+        self.context_chars = context_chars
+        self.max_concurrency = max_concurrency
+        self.last_stats = {}
+
+    def _window(self, text, entity):
+        start = max(0, entity['start'] - self.context_chars)
+        end = min(len(text), entity['end'] + self.context_chars)
+        return text[start:entity['start']] + "<<<" + entity['word'] + ">>>" + text[entity['end']:end]
+
+    def _ambiguous_regions(self, text, entities):
+        """Lines with a PII cue and digits that no detected entity touches."""
+        regions = []
+        for match in LINE.finditer(text):
+            line = match.group(0)
+            if not AMBIGUOUS_CUES.search(line) or not any(c.isdigit() for c in line):
+                continue
+            if any(e['start'] < match.end() and e['end'] > match.start() for e in entities):
+                continue
+            stripped = line.strip()
+            start = match.start() + line.index(stripped)
+            regions.append((start, start + len(stripped)))
+        return regions
+
+    @staticmethod
+    def _verdict(response):
+        if response is None:
+            return None
+        answer = VERDICT.match(response.strip().upper())
+        if answer is None:
+            return None
+        return answer.group(1) == "YES"
+
+    def redact(self, text, compliance_mode="DPDP", agentic_level=0.75, region_chain=None, entity_types="",
+               block_store=None, blocks=None):
+        entities = self.redactor.select_entities(text, compliance_mode, block_store, blocks)
+        uncertain = [e for e in entities if e['score'] < agentic_level]
+        regions = self._ambiguous_regions(text, entities) if region_chain is not None else []
+
+        jobs = [(self.adjudication_chain, {"document_text": self._window(text, e), "entity_types": e['entity_group']})
+                for e in uncertain]
+        jobs += [(region_chain, {"document_text": text[start:end], "entity_types": entity_types})
+                 for start, end in regions]
+
+        def run(job):
+            chain, inputs = job
+            try:
+                return chain.invoke(inputs)
+            except Exception as e:
+                print(f"LLM call failed during hybrid redaction: {e}")
+                return None
+
+        responses = []
+        if jobs:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                responses = list(pool.map(run, jobs))
+        verdicts = {id(e): self._verdict(r) for e, r in zip(uncertain, responses)}
+
+        replacements = []
+        for entity in entities:
+            entity_type = entity['entity_group']
+            verdict = verdicts.get(id(entity), True)
+            if verdict is True or (verdict is None and self.fail_closed):
+                marker = f"[{entity_type}]"
+            elif verdict is None:
+                marker = f"[NEEDS_REVIEW: {entity['word']} ({entity_type})]"
+            else:
+                continue
+            replacements.append((entity['start'], entity['end'], marker))
+        for (start, end), response in zip(regions, responses[len(uncertain):]):
+            if response is not None:
+                replacements.append((start, end, response.strip()))
+            elif self.fail_closed:
+                replacements.append((start, end, "[REDACTED]"))
+
+        redacted_text = text
+        for start, end, replacement in sorted(replacements, reverse=True):
+            redacted_text = redacted_text[:start] + replacement + redacted_text[end:]
+
+        self.last_stats = {
+            "document_chars": len(text),
+            "llm_chars": sum(len(inputs["document_text"]) for _, inputs in jobs),
+            "llm_calls": len(jobs),
+            "adjudicated": len(uncertain),
+            "confirmed": sum(1 for v in verdicts.values() if v is True),
+            "rejected": sum(1 for v in verdicts.values() if v is False),
+            "ambiguous_regions": len(regions),
+        }
+        return redacted_text
@@ -0,0 +1,220 @@
+# pii_engine/llm.py
+# Gemini redaction chain, its response cache and an offline stand-in.
+#
+# get_redaction_chain builds `prompt | LLM | StrOutputParser` behind a
+# CachedRedactionChain, which answers repeated inputs (headers, footers,
+# boilerplate pages) from a local SQLite store. LocalRedactionChain is a regex-only
+# backend with the same interface so the pipeline can run without network access
+# (REDACTION_LLM_BACKEND=local); LocalAdjudicationChain does the same for the
+# hybrid engine's span adjudication. langchain is imported only when a real chain
+# is built.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .detectors import RegexDetector
+
+DEFAULT_CACHE_PATH = os.getenv("REDACTION_LLM_CACHE", "llm_cache.sqlite3")
+# The offline backend gets its own file so its answers never stand in for Gemini's.
+DEFAULT_LOCAL_CACHE_PATH = os.getenv("REDACTION_LLM_LOCAL_CACHE", "llm_cache_local.sqlite3")
+DEFAULT_TTL_SECONDS = float(os.getenv("REDACTION_LLM_CACHE_TTL", 7 * 24 * 3600))
+PURGE_INTERVAL_SECONDS = 3600.0
+
+
+COMPLIANCE_MAP = {
+    "gdpr": ["names", "emails", "phones", "physical mailing addresses", "IP addresses", "social security numbers", "passport numbers"],
+    "hipaa": ["names", "dates", "phone numbers", "emails", "social security numbers", "medical record numbers"],
+    "dpdp": ["names", "emails", "phones", "addresses", "Aadhaar numbers", "PAN numbers", "financial data"]
+}
+
+REDACTION_PROMPT = [
+    ("system", """You are an AI assistant that redacts Personally Identifiable Information (PII).
+        - Detect these PII types: {entity_types}
+        - Replace each PII instance with "[REDACTED]".
+        - Return only the redacted text, preserving original structure and line breaks."""),
+    ("human", "Document Text:\n---\n{document_text}\n---")
+]
+
+
+def offline_mode():
+    """True when the local backend should stand in for Gemini."""
+    return os.getenv("REDACTION_LLM_BACKEND", "").lower() == "local"
+
+
+def prompt_fingerprint(prompt_messages):
+    """Hash of a chain's (role, template) pairs; part of every cache key."""
+    if not prompt_messages:
+        return ""
+    return hashlib.sha256(json.dumps([list(m) for m in prompt_messages]).encode("utf-8")).hexdigest()
+
+
+def load_gemini(model, api_key=None):
+    """Creates the Gemini chat model; imports langchain_google_genai on first use."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    if api_key is None:
+        return ChatGoogleGenerativeAI(model=model, temperature=0)
+    return ChatGoogleGenerativeAI(model=model, temperature=0, google_api_key=api_key)
+
+
+def get_redaction_chain(llm, model, cache=None, prompt_messages=None):
+    """
+    Creates a cached redaction chain. prompt_messages are (role, template) pairs
+    with {entity_types} and {document_text} placeholders; REDACTION_PROMPT by default.
+    In offline mode the local backend is used and llm is ignored.
+    """
+    if offline_mode():
+        return CachedRedactionChain(LocalRedactionChain(), model="local", cache=cache)
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
+    prompt_messages = prompt_messages or REDACTION_PROMPT
+    prompt_template = ChatPromptTemplate.from_messages(prompt_messages)
+    return CachedRedactionChain(prompt_template | llm | StrOutputParser(), model=model, cache=cache,
+                                prompt_messages=prompt_messages)
+
+
+class ResponseCache:
+    """
+    SQLite store of chain responses keyed by (model, prompt hash, entity_types,
+    document_text hash). Entries older than ttl seconds are treated as missing. The
+    latency of the call that produced each entry is stored so hits can report the
+    time they saved. Without a path, offline mode uses DEFAULT_LOCAL_CACHE_PATH.
+    Expired rows are deleted on open and then at most every PURGE_INTERVAL_SECONDS
+    from put(), so the file does not grow without bound.
+    """
+    def __init__(self, path=None, ttl=DEFAULT_TTL_SECONDS):
+        if path is None:
+            path = DEFAULT_LOCAL_CACHE_PATH if offline_mode() else DEFAULT_CACHE_PATH
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.purge_expired()
+
+    @staticmethod
+    def key(model, prompt_hash, entity_types, document_text):
+        text_hash = hashlib.sha256(document_text.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\0{prompt_hash}\0{entity_types}\0{text_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns (response, latency) for a fresh entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl:
+            return None
+        return row[0], row[1]
+
+    def put(self, key, response, latency):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, latency, created_at) VALUES (?, ?, ?, ?)",
+                (key, response, latency, time.time()),
+            )
+            self._conn.commit()
+        if time.monotonic() >= self._next_purge:
+            self.purge_expired()
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+
+    def close(self):
+        self._conn.close()
+
+
+class CachedRedactionChain:
+    """
+    Drop-in wrapper for a redaction chain that consults a ResponseCache first.
+    Counters cover the lifetime of this wrapper, so create one per request to get
+    per-request hit rate and latency saved. prompt_messages are the chain's
+    (role, template) pairs, so editing the prompt starts from an empty cache.
+    """
+    def __init__(self, chain, model, cache=None, prompt_messages=None):
+        self.chain = chain
+        self.model = model
+        self.prompt_hash = prompt_fingerprint(prompt_messages)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.spent_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def invoke(self, inputs):
+        key = self.cache.key(self.model, self.prompt_hash, inputs["entity_types"], inputs["document_text"])
+        cached = self.cache.get(key)
+        if cached is not None:
+            response, latency = cached
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += latency
+            return response
+        start = time.perf_counter()
+        response = self.chain.invoke(inputs)
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            self.spent_seconds += latency
+        self.cache.put(key, response, latency)
+        return response
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "saved_seconds": round(self.saved_seconds, 3),
+            "spent_seconds": round(self.spent_seconds, 3),
+        }
+
+
+class LocalRedactionChain:
+    """
+    Offline stand-in for the Gemini chain. Replaces pattern-detectable PII with
+    "[REDACTED]" and leaves everything else untouched. An optional latency
+    emulates a network round trip for benchmarks.
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.patterns = list(RegexDetector().patterns.values())
+
+    def invoke(self, inputs):
+        if self.latency:
+            time.sleep(self.latency)
+        text = inputs["document_text"]
+        for pattern in self.patterns:
+            text = pattern.sub("[REDACTED]", text)
+        return text
+
+
+class LocalAdjudicationChain:
+    """
+    Offline stand-in for the span adjudication chain used by pii_engine.hybrid.
+    Without a model to ask it always confirms the span, which errs towards redacting.
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def invoke(self, inputs):
+        if self.latency:
+            time.sleep(self.latency)
+        return "YES"
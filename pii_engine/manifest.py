@@ -0,0 +1,99 @@
+# pii_engine/manifest.py
+# Compact span manifests: the redaction decisions for a text without the text.
+#
+# Spans are stored column-wise as integer arrays. Offsets are delta-encoded
+# (gap since the end of the previous span, then span length), scores are kept
+# in per-mille, and types are indices into a small table:
+#
+#   {"version": 1, "length": 5321, "types": ["EMAIL", "PER"],
+#    "gaps": [12, 40], "lengths": [8, 17], "type_ids": [1, 0],
+#    "scores": [912, 1000], "review": [0, 0]}
+#
+# Offsets count Python string characters (code points) of the extracted text.
+
+import gzip
+import importlib.util
+import json
+
+MANIFEST_VERSION = 1
+# msgpack is optional; it is only offered when the package is installed.
+MANIFEST_ENCODINGS = ["json", "gzip"] + (["msgpack"] if importlib.util.find_spec("msgpack") else [])
+
+
+def build_manifest(text, entities, agentic_level=0.75, aggressive=False):
+    """Builds a manifest from non-overlapping entities (as returned by select_entities)."""
+    entities = sorted(entities, key=lambda x: x['start'])
+    types = sorted({e['entity_group'] for e in entities})
+    type_index = {entity_type: i for i, entity_type in enumerate(types)}
+    gaps, lengths, type_ids, scores, review = [], [], [], [], []
+    previous_end = 0
+    for entity in entities:
+        gaps.append(entity['start'] - previous_end)
+        lengths.append(entity['end'] - entity['start'])
+        type_ids.append(type_index[entity['entity_group']])
+        scores.append(int(round(entity['score'] * 1000)))
+        review.append(0 if aggressive or entity['score'] >= agentic_level else 1)
+        previous_end = entity['end']
+    return {
+        "version": MANIFEST_VERSION,
+        "length": len(text),
+        "types": types,
+        "gaps": gaps,
+        "lengths": lengths,
+        "type_ids": type_ids,
+        "scores": scores,
+        "review": review,
+    }
+
+
+def decode_manifest(manifest):
+    """Expands a manifest back into span dicts (without 'word')."""
+    spans = []
+    position = 0
+    for gap, length, type_id, score, review in zip(
+        manifest["gaps"], manifest["lengths"], manifest["type_ids"], manifest["scores"], manifest["review"]
+    ):
+        start = position + gap
+        position = start + length
+        spans.append({
+            'entity_group': manifest["types"][type_id], 'score': score / 1000,
+            'start': start, 'end': position, 'needs_review': bool(review),
+        })
+    return spans
+
+
+def render_redaction(text, manifest):
+    """
+    Applies a manifest to the original text using PIIRedactor.redact's markers.
+    Review markers quote the span's original text.
+    """
+    parts = []
+    position = 0
+    for span in decode_manifest(manifest):
+        parts.append(text[position:span['start']])
+        if span['needs_review']:
+            parts.append(f"[NEEDS_REVIEW: {text[span['start']:span['end']]} ({span['entity_group']})]")
+        else:
+            parts.append(f"[{span['entity_group']}]")
+        position = span['end']
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def encode_manifest(payload, encoding="json"):
+    """
+    Serializes a manifest payload. Returns (body, media_type, headers).
+    msgpack is optional and only imported when asked for.
+    """
+    if encoding == "json":
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8"), "application/json", {}
+    if encoding == "gzip":
+        body = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        return body, "application/json", {"Content-Encoding": "gzip"}
+    if encoding == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise ValueError("msgpack encoding requires the msgpack package.")
+        return msgpack.packb(payload), "application/msgpack", {}
+    raise ValueError(f"Unsupported manifest encoding: {encoding}")
@@ -0,0 +1,274 @@
+# pii_engine/redactor.py
+# PIIRedactor: merges the spans of its detectors, resolves conflicts, stitches
+# addresses and applies compliance-mode redaction.
+
+from .detectors import LLM_ENTITY_GROUP, NERDetector, RegexDetector
+from .manifest import build_manifest
+from .store import split_blocks
+
+
+class PIIRedactor:
+    def __init__(self, model_name="Jean-Baptiste/roberta-large-ner-english", detectors=None):
+        self.model_name = model_name
+        if detectors is None:
+            # NER first so that, for identical spans, NER results keep their original precedence
+            detectors = [NERDetector(model_name), RegexDetector()]
+        self.detectors = detectors
+
+        # Priority map to resolve conflicts. Lower number = higher priority.
+        self.entity_priorities = {
+            'AADHAAR': 1,
+            'PAN_CARD': 1,
+            'PHONE': 2,
+            'EMAIL': 2,
+            'PER': 3,
+            'ORG': 3,
+            'LOC': 4,
+            'DATE': 4,
+            'ADDRESS': 5,
+            'PINCODE': 5,
+            LLM_ENTITY_GROUP: 6,
+            'ACCOUNT_NO': 99, # Lowest priority
+        }
+
+        self.compliance_map = {
+            "GDPR": ["PER", "LOC", "EMAIL", "PHONE", "DATE"],
+            "HIPAA": ["PER", "PHONE", "DATE", "LOC", "AGE", "ID"],
+            "DPDP": ["PER", "EMAIL", "PHONE", "ACCOUNT_NO", "AADHAAR", "PAN_CARD", "LOC", "PINCODE"],
+            "FULL_REDACTION": ["PER", "ORG", "LOC", "EMAIL", "PHONE", "ACCOUNT_NO", "AADHAAR", "PAN_CARD", "DATE", "PINCODE"]
+        }
+
+    def detector_signature(self):
+        """The detectors, in order, and their settings; stored block results are scoped to it."""
+        return "\0".join(detector.signature() for detector in self.detectors)
+
+    def get_detector(self, name):
+        for detector in self.detectors:
+            if detector.name == name:
+                return detector
+        return None
+
+    @property
+    def ner(self):
+        return self.get_detector("ner")
+
+    @property
+    def ner_pipeline(self):
+        """The underlying transformers pipeline; loads the model if needed."""
+        return self.ner.pipeline
+
+    def _resolve_overlaps(self, entities):
+        """
+        Resolves overlapping entities based on a priority list.
+        For example, if a text is matched as both PHONE and ACCOUNT_NO, it keeps PHONE.
+        """
+        if not entities:
+            return []
+
+        # Sort by start index, then by length (longer match first for ties)
+        entities.sort(key=lambda x: (x['start'], -(x['end'] - x['start'])))
+
+        resolved = []
+        last_entity = None
+
+        for current_entity in entities:
+            if last_entity is None:
+                last_entity = current_entity
+                continue
+
+            # Check for overlap with the last accepted entity
+            if current_entity['start'] < last_entity['end']:
+                # Overlap detected, decide which one to keep based on priority
+                last_priority = self.entity_priorities.get(last_entity['entity_group'], 100)
+                current_priority = self.entity_priorities.get(current_entity['entity_group'], 100)
+
+                # If current entity has higher priority (lower number), it replaces the last one
+                if current_priority < last_priority:
+                    last_entity = current_entity
+                # If priorities are equal, the longer one (which was sorted first) is kept.
+            else:
+                # No overlap, the last entity is final. Add it to the list.
+                resolved.append(last_entity)
+                last_entity = current_entity
+
+        # Add the very last entity processed
+        if last_entity is not None:
+            resolved.append(last_entity)
+
+        return resolved
+
+    def _merge(self, spans):
+        resolved_entities = self._resolve_overlaps(spans)
+        resolved_entities.sort(key=lambda x: x['start'])
+        return resolved_entities
+
+    def detect_pii(self, text):
+        spans = []
+        for detector in self.detectors:
+            spans += detector.detect(text)
+        return self._merge(spans)
+
+    def detect_pii_batch(self, texts):
+        """Runs each detector once over all texts; results are in the order of texts."""
+        per_text = [[] for _ in texts]
+        for detector in self.detectors:
+            for spans, found in zip(per_text, detector.detect_batch(texts)):
+                spans += found
+        return [self._merge(spans) for spans in per_text]
+
+    def detect_pii_blocks(self, texts, block_store=None, text_blocks=None):
+        """
+        Detects PII in each text block by block. text_blocks holds one list of
+        (offset, block) pairs per text, e.g. from extract_blocks; a None entry
+        (or no text_blocks) falls back to split_blocks. Every redaction path goes
+        through here, so a run with a block store produces exactly the same
+        entities as a run without one; the store only skips detection for blocks
+        it has seen before. Blocks missing from the store across all texts go
+        through a single detect_pii_batch call and are written back in one
+        transaction. Each entity's 'word' is taken from the block.
+        """
+        if text_blocks is None:
+            text_blocks = [None] * len(texts)
+        text_blocks = [split_blocks(text) if blocks is None else blocks for text, blocks in zip(texts, text_blocks)]
+        namespace = self.detector_signature() if block_store is not None else None
+        found = {}
+        missing = {}
+        for blocks in text_blocks:
+            for _, block in blocks:
+                key = self._block_key(block_store, namespace, block)
+                if key in found or key in missing:
+                    continue
+                block_entities = block_store.get(key) if block_store is not None else None
+                if block_entities is None:
+                    missing[key] = block
+                else:
+                    found[key] = block_entities
+        if missing:
+            detected = dict(zip(missing, self.detect_pii_batch(list(missing.values()))))
+            if block_store is not None:
+                block_store.put_many(detected.items())
+            found.update(detected)
+        results = []
+        for blocks in text_blocks:
+            entities = []
+            for offset, block in blocks:
+                for entity in found[self._block_key(block_store, namespace, block)]:
+                    entities.append(dict(entity, word=block[entity['start']:entity['end']],
+                                         start=entity['start'] + offset, end=entity['end'] + offset))
+            results.append(entities)
+        return results
+
+    @staticmethod
+    def _block_key(block_store, namespace, block):
+        if block_store is None:
+            return block
+        return block_store.fingerprint(namespace, block)
+
+    def detect_pii_incremental(self, text, block_store):
+        """
+        Detects PII block by block, reusing stored results for blocks that were
+        seen before. Only new or edited blocks go through NER.
+        """
+        return self.detect_pii_blocks([text], block_store)[0]
+
+    def detect_pii_batch_incremental(self, texts, block_store):
+        """Batched counterpart of detect_pii_incremental."""
+        return self.detect_pii_blocks(texts, block_store)
+
+    def _stitch_address_entities(self, entities, text, max_gap=15):
+        stitched_entities = []
+        i = 0
+        address_components = {"LOC", "PINCODE"}
+        while i < len(entities):
+            current_entity = entities[i]
+            if current_entity['entity_group'] in address_components:
+                address_block = [current_entity]
+                j = i + 1
+                while j < len(entities):
+                    next_entity = entities[j]
+                    if next_entity['entity_group'] in address_components:
+                        gap_text = text[address_block[-1]['end']:next_entity['start']]
+                        if len(gap_text) < max_gap and all(c in ',- \n\t' for c in gap_text):
+                            address_block.append(next_entity)
+                            j += 1
+                        else: break
+                    else: break
+                if len(address_block) > 1:
+                    start_char, end_char = address_block[0]['start'], address_block[-1]['end']
+                    stitched_entities.append({
+                        'entity_group': 'ADDRESS', 'score': min(e['score'] for e in address_block),
+                        'word': text[start_char:end_char], 'start': start_char, 'end': end_char
+                    })
+                    i = j
+                else:
+                    stitched_entities.append(current_entity)
+                    i += 1
+            else:
+                stitched_entities.append(current_entity)
+                i += 1
+        return stitched_entities
+
+    def _filter_for_mode(self, entities, text, compliance_mode):
+        processed_entities = self._stitch_address_entities(entities, text)
+
+        entities_to_redact_types = self.compliance_map.get(compliance_mode, []).copy()
+        if "LOC" in entities_to_redact_types or "PINCODE" in entities_to_redact_types:
+            if "ADDRESS" not in entities_to_redact_types:
+                entities_to_redact_types.append("ADDRESS")
+        # LLM spans were already restricted to the mode's types by the chain's prompt
+        entities_to_redact_types.append(LLM_ENTITY_GROUP)
+
+        return [e for e in processed_entities if e['entity_group'] in entities_to_redact_types]
+
+    def select_entities(self, text, compliance_mode="DPDP", block_store=None, blocks=None):
+        """
+        Detects, stitches and filters entities down to the types the compliance
+        mode redacts. Returned entities are sorted by start offset.
+        """
+        raw_entities = self.detect_pii_blocks([text], block_store, [blocks])[0]
+        return self._filter_for_mode(raw_entities, text, compliance_mode)
+
+    def _apply_markers(self, text, filtered_entities, agentic_level, aggressive):
+        redacted_text = text
+        for entity in sorted(filtered_entities, key=lambda x: x['start'], reverse=True):
+            start, end = entity['start'], entity['end']
+            entity_type, score = entity['entity_group'], entity['score']
+
+            if aggressive or score >= agentic_level:
+                redaction_marker = f"[{entity_type}]"
+            else:
+                redaction_marker = f"[NEEDS_REVIEW: {entity['word']} ({entity_type})]"
+
+            redacted_text = redacted_text[:start] + redaction_marker + redacted_text[end:]
+
+        return redacted_text
+
+    def redact(self, text, compliance_mode="DPDP", agentic_level=0.75, aggressive=False, block_store=None,
+               blocks=None):
+        filtered_entities = self.select_entities(text, compliance_mode, block_store, blocks)
+        return self._apply_markers(text, filtered_entities, agentic_level, aggressive)
+
+    def manifest(self, text, compliance_mode="DPDP", agentic_level=0.75, aggressive=False, block_store=None,
+                 blocks=None):
+        """Returns the span manifest for text instead of the redacted text (see pii_engine.manifest)."""
+        filtered_entities = self.select_entities(text, compliance_mode, block_store, blocks)
+        return build_manifest(text, filtered_entities, agentic_level, aggressive)
+
+    def redact_batch(self, texts, compliance_mode="DPDP", agentic_level=0.75, aggressive=False, block_store=None,
+                     text_blocks=None):
+        all_entities = self.detect_pii_blocks(texts, block_store, text_blocks)
+        return [
+            self._apply_markers(text, self._filter_for_mode(raw_entities, text, compliance_mode),
+                                agentic_level, aggressive)
+            for text, raw_entities in zip(texts, all_entities)
+        ]
+
+    def redact_json_recursively(self, data, compliance_mode, agentic_level, aggressive, block_store=None):
+        if isinstance(data, dict):
+            return {k: self.redact_json_recursively(v, compliance_mode, agentic_level, aggressive, block_store) for k, v in data.items()}
+        elif isinstance(data, list):
+            return [self.redact_json_recursively(i, compliance_mode, agentic_level, aggressive, block_store) for i in data]
+        elif isinstance(data, str):
+            return self.redact(data, compliance_mode, agentic_level, aggressive, block_store)
+        else:
+            return data
@@ -0,0 +1,93 @@
+# pii_engine/store.py
+# Block splitting and the local store behind incremental re-redaction.
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+
+BLOCK_SEPARATOR = re.compile(r'\n[ \t]*\n\s*')
+
+
+def split_blocks(text):
+    """Split text into paragraph blocks, returning (offset, block) pairs.
+
+    Blocks are separated by blank lines. PIIRedactor always detects per block,
+    with or without a BlockStore. None of the regex patterns can match across a
+    blank line, so the regex spans are the same as for the whole text. Extracted
+    documents come with finer blocks (see pii_engine.formats.extract_blocks).
+    """
+    blocks = []
+    pos = 0
+    for match in BLOCK_SEPARATOR.finditer(text):
+        if match.start() > pos:
+            blocks.append((pos, text[pos:match.start()]))
+        pos = match.end()
+    if pos < len(text):
+        blocks.append((pos, text[pos:]))
+    return blocks
+
+
+# Stored per entity; 'word' is the PII itself and is rebuilt from the block instead.
+STORED_FIELDS = ("entity_group", "score", "start", "end")
+
+
+def _stored(entities):
+    return json.dumps([{field: entity[field] for field in STORED_FIELDS} for entity in entities])
+
+
+class BlockStore:
+    """
+    Local SQLite store of per-block detection results. Only entity types, offsets
+    and scores are written, never the matched text.
+    Blocks are keyed by a fingerprint of a namespace (PIIRedactor passes its
+    detector_signature()) and the block text, so an unchanged paragraph in a new
+    revision of a document reuses its stored entities, but only for the same
+    detector setup.
+    """
+    def __init__(self, path="redaction_blocks.sqlite3"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blocks (fingerprint TEXT PRIMARY KEY, entities TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def fingerprint(namespace, block):
+        return hashlib.sha256(f"{namespace}\0{block}".encode("utf-8")).hexdigest()
+
+    def get(self, fingerprint):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entities FROM blocks WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, fingerprint, entities):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blocks (fingerprint, entities) VALUES (?, ?)",
+                (fingerprint, _stored(entities)),
+            )
+            self._conn.commit()
+
+    def put_many(self, items):
+        """Stores (fingerprint, entities) pairs in a single transaction."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blocks (fingerprint, entities) VALUES (?, ?)",
+                [(fingerprint, _stored(entities)) for fingerprint, entities in items],
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
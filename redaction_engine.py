@@ -1,169 +1,4 @@
-# redaction_engine.py (Upgraded with Conflict Resolution)
+# redaction_engine.py
+# Kept for existing imports; the engine lives in the pii_engine package.
 
-import re
-from transformers import pipeline
-
-class PIIRedactor:
-    def __init__(self, model_name="Jean-Baptiste/roberta-large-ner-english"):
-        print(f"Loading NER model ({model_name})... This might take a moment.")
-        self.ner_pipeline = pipeline("ner", model=model_name, grouped_entities=True)
-        print("NER model loaded.")
-
-        phone_regex = r"""
-            \b
-            (?:(?:\+91|0)[\s-]?)?[6-9]\d{2}[\s-]?\d{3}[\s-]?\d{4}\b|
-            \b0\d{2,4}[\s-]?\d{6,8}\b
-        """
-
-        self.regex_patterns = {
-            "EMAIL": re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'),
-            "PHONE": re.compile(phone_regex, re.VERBOSE),
-            "AADHAAR": re.compile(r'\b[2-9]\d{3}\s?\d{4}\s?\d{4}\b'),
-            "PAN_CARD": re.compile(r'\b[A-Z]{5}\d{4}[A-Z]{1}\b'),
-            # --- IMPROVED: Made ACCOUNT_NO less greedy. It will now be the lowest priority. ---
-            "ACCOUNT_NO": re.compile(r'\b\d{9,18}\b'),
-        }
-
-        # --- NEW: Priority map to resolve conflicts. Lower number = higher priority. ---
-        self.entity_priorities = {
-            'AADHAAR': 1,
-            'PAN_CARD': 1,
-            'PHONE': 2,
-            'EMAIL': 2,
-            'PER': 3,
-            'ORG': 3,
-            'LOC': 4,
-            'DATE': 4,
-            'ADDRESS': 5,
-            'PINCODE': 5,
-            'ACCOUNT_NO': 99, # Lowest priority
-        }
-
-        self.compliance_map = {
-            "GDPR": ["PER", "LOC", "EMAIL", "PHONE", "DATE"],
-            "HIPAA": ["PER", "PHONE", "DATE", "LOC", "AGE", "ID"],
-            "DPDP": ["PER", "EMAIL", "PHONE", "ACCOUNT_NO", "AADHAAR", "PAN_CARD", "LOC", "PINCODE"],
-            "FULL_REDACTION": ["PER", "ORG", "LOC", "EMAIL", "PHONE", "ACCOUNT_NO", "AADHAAR", "PAN_CARD", "DATE", "PINCODE"]
-        }
-
-    # --- NEW: Conflict Resolution Logic ---
-    def _resolve_overlaps(self, entities):
-        """
-        Resolves overlapping entities based on a priority list.
-        For example, if a text is matched as both PHONE and ACCOUNT_NO, it keeps PHONE.
-        """
-        if not entities:
-            return []
-
-        # Sort by start index, then by length (longer match first for ties)
-        entities.sort(key=lambda x: (x['start'], -(x['end'] - x['start'])))
-
-        resolved = []
-        last_entity = None
-
-        for current_entity in entities:
-            if last_entity is None:
-                last_entity = current_entity
-                continue
-
-            # Check for overlap with the last accepted entity
-            if current_entity['start'] < last_entity['end']:
-                # Overlap detected, decide which one to keep based on priority
-                last_priority = self.entity_priorities.get(last_entity['entity_group'], 100)
-                current_priority = self.entity_priorities.get(current_entity['entity_group'], 100)
-
-                # If current entity has higher priority (lower number), it replaces the last one
-                if current_priority < last_priority:
-                    last_entity = current_entity
-                # If priorities are equal, the longer one (which was sorted first) is kept.
-                # So we do nothing if current_priority >= last_priority.
-            else:
-                # No overlap, the last entity is final. Add it to the list.
-                resolved.append(last_entity)
-                last_entity = current_entity
-        
-        # Add the very last entity processed
-        if last_entity is not None:
-            resolved.append(last_entity)
-
-        return resolved
-
-    def detect_pii(self, text):
-        ner_results = self.ner_pipeline(text)
-        for entity in ner_results: entity['score'] = float(entity['score'])
-
-        regex_results = []
-        for entity_type, pattern in self.regex_patterns.items():
-            for match in pattern.finditer(text):
-                regex_results.append({
-                    'entity_group': entity_type, 'score': 1.0, 'word': match.group(0),
-                    'start': match.start(), 'end': match.end()
-                })
-        
-        all_entities = ner_results + regex_results
-        
-        # --- MODIFIED: Added conflict resolution step ---
-        resolved_entities = self._resolve_overlaps(all_entities)
-        resolved_entities.sort(key=lambda x: x['start'])
-        return resolved_entities
-
-    def _stitch_address_entities(self, entities, text, max_gap=15):
-        # This method remains unchanged from the previous version
-        stitched_entities = []
-        i = 0
-        address_components = {"LOC", "PINCODE"}
-        while i < len(entities):
-            current_entity = entities[i]
-            if current_entity['entity_group'] in address_components:
-                address_block = [current_entity]
-                j = i + 1
-                while j < len(entities):
-                    next_entity = entities[j]
-                    if next_entity['entity_group'] in address_components:
-                        gap_text = text[address_block[-1]['end']:next_entity['start']]
-                        if len(gap_text) < max_gap and all(c in ',- \n\t' for c in gap_text):
-                            address_block.append(next_entity)
-                            j += 1
-                        else: break
-                    else: break
-                if len(address_block) > 1:
-                    start_char, end_char = address_block[0]['start'], address_block[-1]['end']
-                    stitched_entities.append({
-                        'entity_group': 'ADDRESS', 'score': min(e['score'] for e in address_block),
-                        'word': text[start_char:end_char], 'start': start_char, 'end': end_char
-                    })
-                    i = j
-                else:
-                    stitched_entities.append(current_entity)
-                    i += 1
-            else:
-                stitched_entities.append(current_entity)
-                i += 1
-        return stitched_entities
-
-    def redact(self, text, compliance_mode="DPDP", agentic_level=0.75, aggressive=False):
-        # --- MODIFIED: Calling the new detect_pii which includes resolution ---
-        raw_entities = self.detect_pii(text)
-        processed_entities = self._stitch_address_entities(raw_entities, text)
-
-        entities_to_redact_types = self.compliance_map.get(compliance_mode, []).copy()
-        if "LOC" in entities_to_redact_types or "PINCODE" in entities_to_redact_types:
-            if "ADDRESS" not in entities_to_redact_types:
-                entities_to_redact_types.append("ADDRESS")
-
-        filtered_entities = [e for e in processed_entities if e['entity_group'] in entities_to_redact_types]
-        filtered_entities.sort(key=lambda x: x['start'], reverse=True)
-        
-        redacted_text = text
-        for entity in filtered_entities:
-            start, end = entity['start'], entity['end']
-            entity_type, score = entity['entity_group'], entity['score']
-            
-            if aggressive or score >= agentic_level:
-                redaction_marker = f"[{entity_type}]"
-            else:
-                redaction_marker = f"[NEEDS_REVIEW: {entity['word']} ({entity_type})]"
-            
-            redacted_text = redacted_text[:start] + redaction_marker + redacted_text[end:]
-            
-        return redacted_text
\ No newline at end of file
+from pii_engine import BlockStore, PIIRedactor, split_blocks  # noqa: F401
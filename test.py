@@ -2,35 +2,12 @@ import os
 import json
 import time
 import io
-import docx
-from dotenv import load_dotenv
-from tqdm import tqdm
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-# Load environment variables
-load_dotenv()
-
-# Define compliance modes
-COMPLIANCE_MAP = {
-    "gdpr": ["names", "emails", "phones", "physical mailing addresses", "IP addresses", "social security numbers", "passport numbers"],
-    "hipaa": ["names", "dates", "phone numbers", "emails", "social security numbers", "medical record numbers"],
-    "dpdp": ["names", "emails", "phones", "addresses", "Aadhaar numbers", "PAN numbers", "financial data"]
-}
-
-# Initialize Gemini model
-try:
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
-except Exception as e:
-    print(f"❌ Error initializing Gemini model: {e}")
-    llm = None
+from pii_engine import COMPLIANCE_MAP, get_redaction_chain, load_gemini, offline_mode
+
+LLM_MODEL = "gemini-2.5-flash"
 
 # Define prompt template
-prompt_template = ChatPromptTemplate.from_messages([
+PROMPT_MESSAGES = [
     ("system", """
 You are an AI assistant trained to identify and redact Personally Identifiable Information (PII) from documents.
 
@@ -44,10 +21,19 @@ Instructions:
 Now process the following document:
 """),
     ("human", "Document Text:\n---\n{document_text}\n---\n\nRedacted Output:")
-])
+]
 
 
-redaction_chain = prompt_template | llm | StrOutputParser() if llm else None
+def build_redaction_chain():
+    """Initialize Gemini (or the offline backend) and wrap it in the cached chain."""
+    if offline_mode():
+        return get_redaction_chain(None, "local")
+    try:
+        llm = load_gemini(LLM_MODEL)
+    except Exception as e:
+        print(f"❌ Error initializing Gemini model: {e}")
+        return None
+    return get_redaction_chain(llm, LLM_MODEL, prompt_messages=PROMPT_MESSAGES)
 
 def load_document(file_path):
     """Load document content based on file type."""
@@ -56,6 +42,7 @@ def load_document(file_path):
 
     if ext == '.pdf':
         try:
+            from PyPDF2 import PdfReader
             reader = PdfReader(file_path)
             text = ""
             for i, page in enumerate(reader.pages):
@@ -68,6 +55,7 @@ def load_document(file_path):
 
     elif ext == '.docx':
         try:
+            import docx
             doc = docx.Document(file_path)
             return "\n".join([para.text for para in doc.paragraphs])
         except Exception as e:
@@ -92,31 +80,62 @@ def load_document(file_path):
 
 
 
+def group_boxes_by_page(redaction_boxes):
+    """Bucket redaction boxes by page index in a single pass."""
+    boxes_by_page = {}
+    for box in redaction_boxes:
+        page_num = box.get('page')
+        if page_num is None:
+            continue
+        boxes_by_page.setdefault(page_num, []).append(box)
+    return boxes_by_page
+
+
 def apply_pdf_redaction(input_path, output_path, redaction_boxes):
-    """Overlay black rectangles on detected PII in PDF."""
+    """Overlay black rectangles on detected PII in PDF.
+
+    Boxes are grouped by page up front and all overlays for the document are
+    drawn into one multi-page canvas, each overlay page sized to reach the
+    upper-right corner of the page it covers. Pages without boxes are copied
+    untouched.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+    from reportlab.pdfgen import canvas
+
     try:
         reader = PdfReader(input_path)
         writer = PdfWriter()
-
-        for page_num, page in enumerate(reader.pages):
-            writer.add_page(page)
-
-            # Create overlay canvas
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=letter)
+        boxes_by_page = group_boxes_by_page(redaction_boxes)
+
+        # Draw every overlay into one canvas; remember which page each belongs to
+        packet = io.BytesIO()
+        can = canvas.Canvas(packet)
+        overlay_pages = []
+        for page_num in sorted(boxes_by_page):
+            if page_num < 0 or page_num >= len(reader.pages):
+                continue
+            mediabox = reader.pages[page_num].mediabox
+            # merge_page does not transform the overlay, only clips it to the overlay's
+            # mediabox in the target page's coordinates. Sizing it to the upper-right
+            # corner covers pages whose mediabox does not start at the origin.
+            can.setPageSize((float(mediabox.right), float(mediabox.top)))
             can.setFillColorRGB(0, 0, 0)
+            for box in boxes_by_page[page_num]:
+                can.rect(box['x'], box['y'], box['width'], box['height'], fill=1)
+            can.showPage()
+            overlay_pages.append(page_num)
 
-            # Draw redaction boxes for this page
-            for box in redaction_boxes:
-                if box.get('page') == page_num:
-                    x, y = box['x'], box['y']
-                    w, h = box['width'], box['height']
-                    can.rect(x, y, w, h, fill=1)
-
+        overlay_for_page = {}
+        if overlay_pages:
             can.save()
             packet.seek(0)
             overlay = PdfReader(packet)
-            writer.pages[page_num].merge_page(overlay.pages[0])
+            overlay_for_page = dict(zip(overlay_pages, overlay.pages))
+
+        for page_num, page in enumerate(reader.pages):
+            if page_num in overlay_for_page:
+                page.merge_page(overlay_for_page[page_num])
+            writer.add_page(page)
 
         # Save final redacted PDF
         with open(output_path, 'wb') as f:
@@ -169,6 +188,13 @@ def save_document(output_path, redacted_text, input_format, original_path):
 
 
 def main():
+    # CLI-only dependencies; the PDF/DOCX helpers above are importable without them
+    from dotenv import load_dotenv
+    from tqdm import tqdm
+
+    # Load environment variables
+    load_dotenv()
+    redaction_chain = build_redaction_chain()
     if not redaction_chain:
         print("❌ Redaction chain not initialized.")
         return
@@ -215,6 +241,9 @@ def main():
             return
 
     print("✅ Redaction complete.")
+    cache_stats = redaction_chain.stats()
+    print(f"🗄️ Cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), "
+          f"hit rate {cache_stats['hit_rate']:.0%}, saved {cache_stats['saved_seconds']:.2f}s")
     base, _ = os.path.splitext(input_file)
     output_path = f"{base}_redacted{ext}"
 
@@ -0,0 +1,57 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.append(str(BACKEND))
+
+import logic  # noqa: E402
+from pii_engine import PIIRedactor, RegexDetector  # noqa: E402
+
+
+def _load_api():
+    # backend/main.py shares its module name with the root API, so load it by path
+    spec = importlib.util.spec_from_file_location("backend_main", BACKEND / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(logic, "redactor", PIIRedactor(detectors=[RegexDetector()]))
+    return TestClient(_load_api().app)
+
+
+def test_download_supports_non_ascii_filenames(client):
+    response = client.post(
+        "/redact",
+        files={"file": ("契約 v2 📄.txt", b"Mail jane.doe@examplecorp.com")},
+        data={"response_mode": "download"},
+    )
+    assert response.status_code == 200
+    assert response.text == "Mail [EMAIL]"
+    disposition = response.headers["content-disposition"]
+    assert disposition.startswith('attachment; filename="redacted_')
+    assert disposition.endswith("filename*=UTF-8''redacted_%E5%A5%91%E7%B4%84%20v2%20%F0%9F%93%84.txt")
+
+
+def test_attachment_header_escapes_quotes():
+    header = _load_api()._attachment_header('a "b";c.txt')
+    assert header == "attachment; filename=\"a__b__c.txt\"; filename*=UTF-8''a%20%22b%22%3Bc.txt"
+    header.encode("latin-1")
+
+
+def test_manifest_encoding_is_only_checked_for_manifests(client):
+    files = {"file": ("a.txt", b"Mail jane.doe@examplecorp.com")}
+    response = client.post("/redact", files=files, data={"manifest_encoding": "bogus"})
+    assert response.status_code == 200
+    assert response.json()["redacted_text"] == "Mail [EMAIL]"
+    response = client.post("/redact", files=files, data={"response_mode": "manifest", "manifest_encoding": "bogus"})
+    assert response.status_code == 400
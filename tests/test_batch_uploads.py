@@ -0,0 +1,52 @@
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import logic  # noqa: E402
+
+
+def _archive():
+    """A zip with an encrypted member, a member failing its CRC check and two good ones."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("a.txt", "encrypted body")
+        archive.writestr("b.txt", "first good member")
+        archive.writestr("c.txt", "corrupted body")
+        archive.writestr("d.txt", "second good member")
+    data = bytearray(buf.getvalue())
+    # Mark a.txt as encrypted in its local header and central directory entry
+    data[6] |= 0x01
+    central = data.index(b"PK\x01\x02")
+    data[central + 8] |= 0x01
+    # Flip a byte of c.txt's data so its CRC no longer matches
+    body = data.index(b"corrupted body")
+    data[body] ^= 0xFF
+    return bytes(data)
+
+
+def test_bad_members_do_not_fail_the_archive_or_later_uploads():
+    results = list(logic.expand_uploads([("x.zip", _archive()), ("later.txt", b"later")]))
+    by_name = {name: (content, error) for name, content, error in results}
+    assert [name for name, _, _ in results] == ["x.zip/a.txt", "x.zip/b.txt", "x.zip/c.txt", "x.zip/d.txt", "later.txt"]
+    assert by_name["x.zip/a.txt"][1].startswith("Cannot read archive member")
+    assert by_name["x.zip/c.txt"][1].startswith("Cannot read archive member")
+    assert by_name["x.zip/b.txt"] == (b"first good member", None)
+    assert by_name["x.zip/d.txt"] == (b"second good member", None)
+    assert by_name["later.txt"] == (b"later", None)
+
+
+def test_members_over_the_limits_are_reported_and_skipped(monkeypatch):
+    monkeypatch.setattr(logic, "MAX_ZIP_MEMBERS", 1)
+    results = list(logic.expand_uploads([("x.zip", _archive())]))
+    assert results[0][1] is None and results[0][2].startswith("Cannot read")
+    assert all(content is None and error.startswith("Skipped") for _, content, error in results[1:])
+
+
+def test_invalid_archive_is_one_error_line():
+    assert list(logic.expand_uploads([("x.zip", b"not a zip")]))[0][2].startswith("Invalid zip archive")
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pii_engine import Detector, HybridRedactor, PIIRedactor, RegexDetector  # noqa: E402
+
+TEXT = "Signed by Jane Doe.\nSSN 123-45-6789 on file."
+
+
+class UnsureNER(Detector):
+    """Finds one name with a score below the default agentic level."""
+    name = "ner"
+
+    def detect(self, text):
+        start = text.find("Jane Doe")
+        if start < 0:
+            return []
+        return [{'entity_group': 'PER', 'score': 0.5, 'word': "Jane Doe", 'start': start, 'end': start + 8}]
+
+
+class ScriptedChain:
+    def __init__(self, answer):
+        self.answer = answer
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def _hybrid(answer, fail_closed=False):
+    redactor = PIIRedactor(detectors=[UnsureNER(), RegexDetector()])
+    return HybridRedactor(redactor, ScriptedChain(answer), fail_closed=fail_closed)
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("YES", "Signed by [PER]."),
+    ("no.", "Signed by Jane Doe."),
+    ("Not sure", "Signed by [NEEDS_REVIEW: Jane Doe (PER)]."),
+    (RuntimeError("quota exceeded"), "Signed by [NEEDS_REVIEW: Jane Doe (PER)]."),
+])
+def test_adjudication_verdicts(answer, expected):
+    hybrid = _hybrid(answer)
+    assert hybrid.redact("Signed by Jane Doe.") == expected
+    assert hybrid.adjudication_chain.inputs[0]["document_text"] == "Signed by <<<Jane Doe>>>."
+    assert hybrid.last_stats["adjudicated"] == 1
+
+
+@pytest.mark.parametrize("answer", ["Not sure", RuntimeError("quota exceeded")])
+def test_fail_closed_never_quotes_unreviewed_pii(answer):
+    assert _hybrid(answer, fail_closed=True).redact("Signed by Jane Doe.") == "Signed by [PER]."
+
+
+def test_confident_spans_skip_the_llm():
+    hybrid = _hybrid("NO")
+    assert hybrid.redact("Signed by Jane Doe.", agentic_level=0.4) == "Signed by [PER]."
+    assert hybrid.adjudication_chain.inputs == []
+
+
+def test_ambiguous_regions_are_replaced_with_the_region_chain_answer():
+    region_chain = ScriptedChain("  SSN [REDACTED] on file.\n")
+    result = _hybrid("YES").redact(TEXT, region_chain=region_chain, entity_types="social security numbers")
+    assert result == "Signed by [PER].\nSSN [REDACTED] on file."
+    assert region_chain.inputs == [{"document_text": "SSN 123-45-6789 on file.", "entity_types": "social security numbers"}]
+
+
+@pytest.mark.parametrize("fail_closed, expected", [
+    (False, "Signed by [PER].\nSSN 123-45-6789 on file."),
+    (True, "Signed by [PER].\n[REDACTED]"),
+])
+def test_failed_region_calls(fail_closed, expected):
+    region_chain = ScriptedChain(RuntimeError("timeout"))
+    assert _hybrid("YES", fail_closed).redact(TEXT, region_chain=region_chain) == expected
@@ -0,0 +1,124 @@
+import io
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pii_engine import BlockStore, Detector, PIIRedactor, RegexDetector, extract_blocks  # noqa: E402
+
+DOCUMENT = (
+    "Jane Doe joined Acme on Monday.\n\n"
+    "Reach her at jane.doe@examplecorp.com or 9876543210.\n\n"
+    "  \n"
+    "Ravi Kumar approved the budget. Jane Doe signed it.\n"
+)
+
+
+class ContextSensitiveNER(Detector):
+    """Stand-in for NER whose scores depend on how much text it sees."""
+    name = "ner"
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, text):
+        self.calls += 1
+        score = 0.9 if len(text) < 60 else 0.7
+        return [
+            {'entity_group': 'PER', 'score': score, 'word': m.group(0), 'start': m.start(), 'end': m.end()}
+            for m in re.finditer(r'\b(?:Jane Doe|Ravi Kumar)\b', text)
+        ]
+
+
+def _redactor():
+    return PIIRedactor(detectors=[ContextSensitiveNER(), RegexDetector()])
+
+
+def test_incremental_run_matches_full_run():
+    full = _redactor().redact(DOCUMENT, agentic_level=0.8)
+    store = BlockStore(":memory:")
+    cold = _redactor().redact(DOCUMENT, agentic_level=0.8, block_store=store)
+    warm = _redactor().redact(DOCUMENT, agentic_level=0.8, block_store=store)
+    assert full == cold == warm
+    assert store.hits == 3
+
+
+def test_only_edited_blocks_are_detected_again():
+    store = BlockStore(":memory:")
+    _redactor().redact(DOCUMENT, block_store=store)
+    redactor = _redactor()
+    revised = DOCUMENT.replace("Monday", "Tuesday")
+    assert redactor.redact(revised, block_store=store) == _redactor().redact(revised)
+    assert redactor.get_detector("ner").calls == 1
+
+
+def test_batch_matches_single_redaction():
+    texts = [DOCUMENT, "Call 9876543210", DOCUMENT]
+    store = BlockStore(":memory:")
+    expected = [_redactor().redact(text) for text in texts]
+    assert _redactor().redact_batch(texts) == expected
+    assert _redactor().redact_batch(texts, block_store=store) == expected
+
+
+def test_stored_blocks_are_scoped_to_the_detector_setup():
+    store = BlockStore(":memory:")
+    regex_only = PIIRedactor(detectors=[RegexDetector()]).redact(DOCUMENT, block_store=store)
+    assert "Jane Doe" in regex_only
+    with_ner = _redactor().redact(DOCUMENT, block_store=store)
+    assert with_ner == _redactor().redact(DOCUMENT)
+    assert "Jane Doe" not in with_ner
+    assert store.hits == 0
+
+
+PARAGRAPHS = [
+    "This agreement is made between Jane Doe and Acme.",
+    "Notices go to jane.doe@examplecorp.com.",
+    "Payments are due within 30 days.",
+]
+
+
+def _docx(paragraphs):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+def _pdf(pages):
+    fitz = pytest.importorskip("fitz")
+    document = fitz.open()
+    for page_text in pages:
+        document.new_page().insert_text((72, 72), page_text)
+    return document.tobytes()
+
+
+@pytest.mark.parametrize("suffix, build", [(".docx", _docx), (".pdf", _pdf)])
+def test_document_edits_only_rerun_their_paragraph_or_page(suffix, build):
+    text, blocks = extract_blocks(suffix, build(PARAGRAPHS))
+    assert [block.strip() for _, block in blocks] == PARAGRAPHS
+    assert all(text[offset:offset + len(block)] == block for offset, block in blocks)
+
+    store = BlockStore(":memory:")
+    _redactor().redact(text, block_store=store, blocks=blocks)
+    revised = PARAGRAPHS[:2] + ["Payments are due within 45 days."]
+    text, blocks = extract_blocks(suffix, build(revised))
+    redactor = _redactor()
+    incremental = redactor.redact(text, block_store=store, blocks=blocks)
+    assert redactor.get_detector("ner").calls == 1
+    assert incremental == _redactor().redact(text, blocks=blocks)
+
+
+def test_store_keeps_no_matched_text():
+    store = BlockStore(":memory:")
+    _redactor().redact(DOCUMENT, agentic_level=1.0, block_store=store)
+    rows = " ".join(entities for _, entities in store._conn.execute("SELECT * FROM blocks"))
+    assert "Jane Doe" not in rows and "jane.doe@" not in rows
+    # Review markers quote the text, rebuilt from the block on a warm run
+    assert _redactor().redact(DOCUMENT, agentic_level=1.0, block_store=store) == _redactor().redact(
+        DOCUMENT, agentic_level=1.0)
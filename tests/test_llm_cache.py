@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pii_engine import CachedRedactionChain, ResponseCache  # noqa: E402
+from pii_engine import llm  # noqa: E402
+
+
+class CountingChain:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return inputs["document_text"].upper()
+
+
+PROMPT = [("system", "Redact {entity_types}."), ("human", "{document_text}")]
+EDITED_PROMPT = [("system", "Redact only {entity_types}."), ("human", "{document_text}")]
+INPUTS = {"document_text": "Jane Doe", "entity_types": "names"}
+
+
+def test_editing_the_prompt_misses_the_cache():
+    cache = ResponseCache(":memory:")
+    chain = CountingChain()
+    CachedRedactionChain(chain, "gemini", cache, prompt_messages=PROMPT).invoke(INPUTS)
+    CachedRedactionChain(chain, "gemini", cache, prompt_messages=PROMPT).invoke(INPUTS)
+    assert chain.calls == 1
+    CachedRedactionChain(chain, "gemini", cache, prompt_messages=EDITED_PROMPT).invoke(INPUTS)
+    assert chain.calls == 2
+
+
+def test_offline_mode_uses_its_own_cache_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("REDACTION_LLM_BACKEND", "local")
+    assert ResponseCache().path == llm.DEFAULT_LOCAL_CACHE_PATH != llm.DEFAULT_CACHE_PATH
+    monkeypatch.delenv("REDACTION_LLM_BACKEND")
+    assert ResponseCache().path == llm.DEFAULT_CACHE_PATH
+
+
+def _rows(path):
+    import sqlite3
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT key FROM responses ORDER BY key")]
+
+
+def test_expired_rows_are_purged_on_open_and_from_put(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path, ttl=60)
+    cache.put("old", "response", 0.1)
+    cache.close()
+
+    monkeypatch.setattr(llm.time, "time", lambda: 1e12)
+    cache = ResponseCache(path, ttl=60)
+    assert _rows(path) == []
+
+    cache.put("a", "response", 0.1)
+    monkeypatch.setattr(llm.time, "time", lambda: 1e12 + 120)
+    cache.put("b", "response", 0.1)
+    assert _rows(path) == ["a", "b"]
+    monkeypatch.setattr(llm.time, "monotonic", lambda: float("inf"))
+    cache.put("c", "response", 0.1)
+    assert _rows(path) == ["b", "c"]
@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pii_engine import NERDetector  # noqa: E402
+
+
+@pytest.mark.parametrize("text", [
+    "Jane Doe signed the lease",
+    "signed by Émilie Durand",
+    "договор подписал Иван Петров",
+    "अनुबंध पर राम ने हस्ताक्षर किए",
+])
+def test_heuristic_gate_passes_names_in_any_script(text):
+    detector = NERDetector()
+    detector.ner_heuristics = True
+    assert detector._needs_ner(text)
+
+
+@pytest.mark.parametrize("text", ["UK", "met jane doe in paris", "émilie écrit"])
+def test_default_gate_passes_short_and_lowercase_text(text):
+    assert NERDetector()._needs_ner(text)
+
+
+def test_default_gate_skips_blank_text_and_repeats_without_entities():
+    detector = NERDetector()
+    assert not detector._needs_ner(" \n\t")
+    detector._remember_safe("Payments are due within 30 days.")
+    assert not detector._needs_ner("Payments are due within 30 days.")
+
+
+@pytest.mark.parametrize("text", ["ok", "12345 67890", "all lowercase words here", "émilie écrit"])
+def test_heuristic_gate_skips_text_without_capitalised_words(text):
+    detector = NERDetector()
+    detector.ner_heuristics = True
+    assert not detector._needs_ner(text)
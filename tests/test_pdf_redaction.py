@@ -0,0 +1,67 @@
+import importlib.util
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+PyPDF2 = pytest.importorskip("PyPDF2")
+pytest.importorskip("reportlab")
+
+from reportlab.pdfgen import canvas  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def _load_cli():
+    # test.py shares its name with the stdlib `test` package, so load it by path
+    spec = importlib.util.spec_from_file_location("redaction_cli", REPO_ROOT / "test.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _offset_mediabox_pdf(path):
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(612, 792))
+    can.drawString(150, 152, "Jane Doe")
+    can.showPage()
+    can.save()
+    packet.seek(0)
+    reader = PyPDF2.PdfReader(packet)
+    page = reader.pages[0]
+    page.mediabox.lower_left = (100, 100)
+    writer = PyPDF2.PdfWriter()
+    writer.add_page(page)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_redaction_box_lands_on_offset_mediabox(tmp_path):
+    cli = _load_cli()
+    source, output = tmp_path / "source.pdf", tmp_path / "redacted.pdf"
+    _offset_mediabox_pdf(source)
+
+    cli.apply_pdf_redaction(str(source), str(output),
+                            [{'page': 0, 'x': 150, 'y': 150, 'width': 50, 'height': 12}])
+
+    page = PyPDF2.PdfReader(str(output)).pages[0]
+    assert [float(v) for v in page.mediabox] == [100, 100, 612, 792]
+    content = page.get_contents().get_data()
+    # The box is drawn in the page's own coordinates, inside an overlay clip that
+    # reaches the page's upper-right corner, and is not shifted by a transform.
+    assert b"150 150 50 12 re" in content
+    assert b"0 0 612 792 re" in content
+    assert b"-100 -100 cm" not in content
+
+
+def test_pages_without_boxes_are_left_alone(tmp_path):
+    cli = _load_cli()
+    source, output = tmp_path / "source.pdf", tmp_path / "redacted.pdf"
+    _offset_mediabox_pdf(source)
+
+    cli.apply_pdf_redaction(str(source), str(output), [{'page': 5, 'x': 0, 'y': 0, 'width': 1, 'height': 1}])
+
+    original = PyPDF2.PdfReader(str(source)).pages[0].get_contents().get_data()
+    assert PyPDF2.PdfReader(str(output)).pages[0].get_contents().get_data() == original